@@ -0,0 +1,130 @@
+"""Time cursor moves and centering on large trees, with the row index and
+with the walk over the visible rows it replaced.
+
+Run from a checkout with ``python benchmarks/cursor_moves.py``. The trees
+are flat directories of files, all expanded, with a 40 row panel.
+"""
+import contextlib
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(__file__)), "src"))
+
+from bookmark.components.widgets import ControlTree  # noqa: E402
+from bookmark.components.widgets.bookmark_dir_tree import DirTree  # noqa: E402
+
+SIZES = [(20, 100), (50, 100), (100, 200)]
+MOVES = 400
+CENTERS = 20
+
+
+class Panel:
+    actual_height = 40
+    y_top = 0
+
+
+def next_sibling(self):
+    if self.parent is None:
+        return None
+    siblings = iter(self.parent.children)
+    for node in siblings:
+        if node is self:
+            return next(siblings, None)
+    return None
+
+
+def previous_sibling(self):
+    if self.parent is None:
+        return None
+    sibling = None
+    for node in self.parent.children:
+        if node is self:
+            return sibling
+        sibling = node
+    return None
+
+
+def cursor_line(self):
+    line = 0
+    node = self
+    while node.id != self.cursor:
+        node = node.next_node
+        line += 1
+    return line
+
+
+def visible_height(self):
+    height = 0
+    node = self
+    while node is not None:
+        node = node.next_node
+        height += 1
+    return height
+
+
+WALK = {
+    "next_sibling": property(next_sibling),
+    "previous_sibling": property(previous_sibling),
+    "cursor_line": property(cursor_line),
+    "visible_height": property(visible_height),
+}
+
+
+@contextlib.contextmanager
+def walk():
+    """Use the old walks for siblings, the cursor line and the height."""
+    saved = {name: getattr(ControlTree, name) for name in WALK}
+    for name, value in WALK.items():
+        setattr(ControlTree, name, value)
+    try:
+        yield
+    finally:
+        for name, value in saved.items():
+            setattr(ControlTree, name, value)
+
+
+def build(dirs, files):
+    tree = DirTree("/nonexistent")
+    tree.panel = Panel()
+    for d in range(dirs):
+        node = tree.add(f"d{d}", type="dir", path=f"/x/d{d}")
+        for f in range(files):
+            node.add(f"f{f}", type="file", path=f"/x/d{d}/f{f}")
+        node.expanded = True
+    tree.cursor = tree.children[0].id
+    tree.nodes[tree.cursor].toggle_highlight()
+    return tree
+
+
+def per_call(function, count):
+    start = time.perf_counter()
+    for _ in range(count):
+        function()
+    return (time.perf_counter() - start) / count * 1e6
+
+
+def measure(dirs, files):
+    tree = build(dirs, files)
+    moves = min(tree.visible_height - 1, MOVES)
+    down = per_call(tree.cursor_down, moves)
+    up = per_call(tree.cursor_up, moves)
+    for _ in range(moves // 2):
+        tree.cursor_down()
+    center = per_call(tree.center, CENTERS)
+    return tree.visible_height, tree.cursor_line, down, up, center
+
+
+def main():
+    print("        rows  line   down us     up us  center us")
+    for dirs, files in SIZES:
+        with walk():
+            old = measure(dirs, files)
+        new = measure(dirs, files)
+        assert old[:2] == new[:2]
+        for name, (rows, line, down, up, center) in (("walk", old), ("index", new)):
+            print(f"{name:5s} {rows:6d} {line:5d} {down:9.1f} {up:9.1f} {center:10.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,64 @@
+"""Time bm import of 5k and 50k bookmarks with each store backend.
+
+Run from a checkout with ``python benchmarks/import_bookmarks.py``. Every
+run uses a fresh temporary HOME. Imports are linear when the time per
+entry stays about the same as the count grows.
+"""
+import io
+import os
+import sys
+import tempfile
+import threading
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(__file__)), "src"))
+
+from bookmark.scripts import loader  # noqa: E402
+from bookmark.scripts.manage_bookmarks import import_bookmarks  # noqa: E402
+
+COUNTS = [5000, 50000]
+BACKENDS = ["sqlite", "json", "journal"]
+
+
+def make_dirs(root, count):
+    for i in range(count):
+        os.mkdir(os.path.join(root, f"dir_{i}"))
+
+
+def time_import(root, count, backend):
+    with tempfile.TemporaryDirectory() as home:
+        os.environ["HOME"] = home
+        os.environ["BOOKMARK_BACKEND"] = backend
+        loader._state.update(store=None, stamp=None, data=None)
+        # What bm -r does, the JSON store needs its file to exist.
+        loader.get_store().reset()
+        tsv = "".join(f"name_{i}\t{root}/dir_{i}\n" for i in range(count))
+        start = time.perf_counter()
+        imported, invalid = import_bookmarks(io.StringIO(tsv))
+        # bm waits for the journal's compaction before it exits.
+        for thread in threading.enumerate():
+            if thread is not threading.current_thread() and not thread.daemon:
+                thread.join()
+        elapsed = time.perf_counter() - start
+        assert len(imported) == count and not invalid
+        return elapsed
+
+
+def main():
+    for name in list(os.environ):
+        if name.startswith("BOOKMARK_") or name == "XDG_CACHE_HOME":
+            del os.environ[name]
+    with tempfile.TemporaryDirectory() as root:
+        make_dirs(root, max(COUNTS))
+        print(f"{'backend':8s} {'entries':>8s} {'seconds':>8s} {'us/entry':>9s}")
+        for backend in BACKENDS:
+            for count in COUNTS:
+                elapsed = time_import(root, count, backend)
+                print(
+                    f"{backend:8s} {count:8d} {elapsed:8.3f} "
+                    f"{elapsed / count * 1e6:9.1f}"
+                )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,69 @@
+"""Measure the memory a NodeStore and DirNodes take per entry, with
+tracemalloc.
+
+Run from a checkout with ``python benchmarks/node_store_memory.py``. The
+NodeStore holds 1000 directories of 1000 files, 1M entries, and the peak
+of one search pass over it is measured too. DirNodes are measured on the
+first 20 directories only, with their rows counted as drawing the tree
+does, and scaled to 1M entries.
+"""
+import gc
+import os
+import sys
+import tracemalloc
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(__file__)), "src"))
+
+from bookmark.components.widgets.bookmark_dir_tree import DirTree  # noqa: E402
+from bookmark.scripts.node_store import NodeStore  # noqa: E402
+
+DIRS = 1000
+FILES = 1000
+TREE_DIRS = 20
+
+
+def traced():
+    gc.collect()
+    return tracemalloc.get_traced_memory()[0]
+
+
+def report(kind, entries, used):
+    print(
+        f"{kind:9s} {entries:9d} entries {used / 2**20:7.1f} MiB "
+        f"{used / entries:5.0f} B/entry {used / entries * 1e6 / 2**30:5.2f} GiB per 1M"
+    )
+
+
+def main():
+    dirs = [f"dir_{i:04d}" for i in range(DIRS)]
+    files = [f"file_{i:06d}.txt" for i in range(FILES)]
+    tracemalloc.start()
+
+    start = traced()
+    store = NodeStore()
+    base = store.add_base("/root")
+    first = store.add_listing(base, dirs, [])
+    for i in range(DIRS):
+        store.add_listing(first + i, [], files)
+    report("NodeStore", len(store), traced() - start)
+
+    # What search does with the candidates: one label map over all of them.
+    start = traced()
+    tracemalloc.reset_peak()
+    label_map = {entry.label: entry for entry in store.entries()}
+    peak = tracemalloc.get_traced_memory()[1] - start
+    print(f"search pass peak {peak / 2**20:.1f} MiB for {len(label_map)} labels")
+    del store, label_map
+
+    start = traced()
+    tree = DirTree("/root")
+    for directory in dirs[:TREE_DIRS]:
+        node = tree.add(directory, path=f"/root/{directory}")
+        for file in files:
+            node.add(file, type="file", path=f"/root/{directory}/{file}")
+    tree.rows()
+    report("DirNode", len(tree.nodes) - 1, traced() - start)
+
+
+if __name__ == "__main__":
+    main()
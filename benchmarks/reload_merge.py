@@ -0,0 +1,52 @@
+"""Time reload_children after N files are added to and N/4 removed from a
+listed directory of N files.
+
+Run from a checkout with ``python benchmarks/reload_merge.py``. The tree
+shows every entry instead of a page of them, and after each reload its
+children are checked against a fresh scan.
+"""
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(__file__)), "src"))
+
+from bookmark.components.widgets.bookmark_dir_tree import (  # noqa: E402
+    DirTree,
+    reload_children,
+)
+from bookmark.scripts import scanner  # noqa: E402
+
+SIZES = [1000, 10000, 100000]
+
+
+def measure(root, count):
+    for i in range(count):
+        open(os.path.join(root, f"old_{i:06d}"), "w").close()
+    tree = DirTree(root)
+    tree.limit = 3 * count
+    tree.initialize(root)
+    for i in range(0, count, 4):
+        os.unlink(os.path.join(root, f"old_{i:06d}"))
+    for i in range(count):
+        open(os.path.join(root, f"new_{i:06d}"), "w").close()
+    start = time.perf_counter()
+    reload_children(tree)
+    elapsed = time.perf_counter() - start
+    dirs, files = scanner.scan(root)
+    labels = [child.label[child.label.rfind("]") + 1 :] for child in tree.children]
+    assert labels == dirs + files
+    assert len(tree.nodes) == 1 + len(tree.children)
+    return elapsed
+
+
+def main():
+    print(f"{'N':>7s} {'seconds':>8s}")
+    for count in SIZES:
+        with tempfile.TemporaryDirectory() as root:
+            print(f"{count:7d} {measure(root, count):8.3f}")
+
+
+if __name__ == "__main__":
+    main()
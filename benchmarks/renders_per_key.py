@@ -0,0 +1,80 @@
+"""Count the frames the dashboard draws, and the CPU it uses, while idle,
+while typing and for unbound keys.
+
+Run from a checkout with ``python benchmarks/renders_per_key.py``. The
+dashboard runs on a fake terminal with a scripted getkey, in a temporary
+HOME with one bookmark of 2000 files.
+"""
+import io
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(__file__)), "src"))
+
+from rich.console import Console  # noqa: E402
+
+from bookmark.components import app as app_module  # noqa: E402
+from bookmark.scripts import loader  # noqa: E402
+
+FILES = 2000
+
+
+def script(app, phases):
+    def mark(name):
+        phases.append((name, app.renderer.renders, time.process_time()))
+
+    time.sleep(0.5)
+    mark("start")
+    time.sleep(2)
+    mark("idle 2 s")
+    yield "2"
+    time.sleep(0.3)
+    mark("focus tree")
+    for _ in range(60):
+        time.sleep(0.02)
+        yield "j"
+    time.sleep(0.3)
+    mark("60 x j at 50 keys/s")
+    for _ in range(30):
+        yield "j"
+    time.sleep(0.3)
+    mark("30 x j in one burst")
+    for _ in range(20):
+        time.sleep(0.05)
+        yield "x"
+    time.sleep(0.3)
+    mark("20 unbound keys")
+    time.sleep(1)
+    mark("idle 1 s")
+    yield "q"
+
+
+def main():
+    with tempfile.TemporaryDirectory() as home:
+        os.environ["HOME"] = home
+        for name in list(os.environ):
+            if name.startswith(("BOOKMARK_", "BM_")) or name == "XDG_CACHE_HOME":
+                del os.environ[name]
+        root = os.path.join(home, "project")
+        os.mkdir(root)
+        for i in range(FILES):
+            open(os.path.join(root, f"file_{i:04d}.txt"), "w").close()
+        loader.get_store().add("project", root)
+
+        console = Console(file=io.StringIO(), force_terminal=True, width=120, height=40)
+        app_module.get_console = lambda: console
+        app = app_module.App()
+        phases = []
+        keys = script(app, phases)
+        app_module.getkey = lambda: next(keys)
+        app.run()
+
+    print(f"{'phase':22s} {'renders':>7s} {'cpu s':>7s}")
+    for previous, (name, renders, cpu) in zip(phases, phases[1:]):
+        print(f"{name:22s} {renders - previous[1]:7d} {cpu - previous[2]:7.3f}")
+
+
+if __name__ == "__main__":
+    main()
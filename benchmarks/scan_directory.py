@@ -0,0 +1,56 @@
+"""Time listing a directory of 100k entries with scanner.scan and with
+the os.listdir and os.path.isdir loop it replaced.
+
+Run from a checkout with ``python benchmarks/scan_directory.py``. The old
+loop gets a set for its membership test, its list made it quadratic.
+"""
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(__file__)), "src"))
+
+from bookmark.scripts import scanner  # noqa: E402
+
+ENTRIES = 100000
+# One entry in this many is a directory.
+DIR_EVERY = 10
+RUNS = 5
+
+
+def listdir_isdir(path):
+    names = os.listdir(path)
+    dirs = [name for name in names if os.path.isdir(f"{path}/{name}")]
+    dir_set = set(dirs)
+    files = [name for name in names if name not in dir_set]
+    return sorted(dirs), sorted(files)
+
+
+def best(function, path):
+    times = []
+    for _ in range(RUNS):
+        start = time.perf_counter()
+        result = function(path)
+        times.append(time.perf_counter() - start)
+    return min(times), result
+
+
+def main():
+    with tempfile.TemporaryDirectory() as root:
+        for i in range(ENTRIES):
+            path = os.path.join(root, f"entry_{i}")
+            if i % DIR_EVERY:
+                open(path, "w").close()
+            else:
+                os.mkdir(path)
+        old, old_result = best(listdir_isdir, root)
+        new, new_result = best(scanner.scan, root)
+        assert old_result == new_result
+        print(f"{ENTRIES} entries, best of {RUNS}")
+        print(f"listdir + isdir  {old:.3f} s")
+        print(f"scanner.scan     {new:.3f} s")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,18 +1,74 @@
-import os
 from getkey import platform, keys
+from rich import get_console
 from rich.layout import Layout
-from rich.live import Live
 from rich.console import Console
+from bookmark.components.screen import Screen
 from bookmark.components.widgets import ScrollPanel, BookmarkTree, SearchBar
 from shutil import which
+import signal
+import threading
+import time
 
 
 suppress = platform(interrupts={})
 getkey = suppress.getkey
 
 
+class Renderer:
+    """Refreshes a Screen when something changed, at most once a frame.
+
+    Changes are reported with ``invalidate`` from any thread. The first one
+    wakes the render thread, and all changes made until the next frame is
+    due are drawn in that frame. Nothing is drawn while nothing changes.
+    """
+
+    def __init__(self, screen, lock, interval=1 / 60):
+        self.screen = screen
+        self.lock = lock
+        self.interval = interval
+        self.dirty = False
+        self.stopped = False
+        self.renders = 0
+        self.last = 0.0
+        self.wake = threading.Event()
+        self.thread = threading.Thread(target=self.run, daemon=True)
+
+    def start(self):
+        self.thread.start()
+
+    def stop(self):
+        self.stopped = True
+        self.wake.set()
+        self.thread.join()
+
+    def invalidate(self):
+        self.dirty = True
+        self.wake.set()
+
+    def run(self):
+        while True:
+            self.wake.wait()
+            delay = self.last + self.interval - time.monotonic()
+            if delay > 0 and not self.stopped:
+                time.sleep(delay)
+            self.wake.clear()
+            with self.lock:
+                if self.stopped:
+                    return
+                if not self.dirty:
+                    continue
+                self.dirty = False
+                self.screen.refresh()
+                self.renders += 1
+            self.last = time.monotonic()
+
+
 class App:
     def setup(self):
+        # Held while handling a key, so background workers can safely add
+        # nodes to the trees in between.
+        self.lock = threading.RLock()
+        self.renderer = None
         self.console = Console(record=True)
         layout = Layout()
         layout.split_row(
@@ -40,10 +96,7 @@ class App:
         self.searchbar = layout["searchbar"].renderable
         layout["searchbar"].visible = False
         bookmarks = BookmarkTree("Bookmarks", style="cyan", app=self)
-        if os.getenv("BOOKMARK_PATH") is not None:
-            bookmarks.load_file(f"{os.getenv('BOOKMARK_PATH')}")
-        else:
-            bookmarks.load_file(f"{os.getenv('HOME')}/.bookmarks")
+        bookmarks.load_file()
         layout["bookmarks"].update(
             ScrollPanel(bookmarks, title="Bookmarks", border_style="Blue", app=self)
         )
@@ -78,7 +131,7 @@ class App:
         self.previous_preview = self.layout["preview"]
         self.previous_searchbar = self.layout["searchbar"]
         self.layout["bookmarks"].renderable.toggle_focus()
-        self.bookmarks.enter()
+        self.bookmarks.enter(record=False)
         self.focus("bookmarks")
         if not which("fzf"):
             self.fzf_path = ""
@@ -121,6 +174,10 @@ class App:
             self.selected = self.layout[element]
             self.selected.renderable.toggle_focus()
 
+    def invalidate(self):
+        if self.renderer is not None:
+            self.renderer.invalidate()
+
     def toggle_search(self):
         if self.mode == "search_suspended":
             self.mode = None
@@ -132,41 +189,69 @@ class App:
             self.setup()
         else:
             self.reload()
-        with Live(self.layout, refresh_per_second=60, screen=True):
-            result = None
-            self.mode = None
-            while result is None:
-                key = getkey()
-                if key == "s":
-                    if self.mode is None:
-                        self.toggle_search()
-                    elif self.mode == "search_suspended":
-                        self.searchbar.toggle_show()
-                        self.toggle_search()
-                    elif self.mode == "search":
-                        self.searchbar.write(key)
+        # The display is only redrawn after a key or a background change,
+        # instead of 60 times a second, and only where it changed.
+        with Screen(self.layout, get_console()) as screen:
+            self.renderer = Renderer(screen, self.lock)
+            self.renderer.start()
+            winch = getattr(signal, "SIGWINCH", None)
+            if winch is not None:
+                resize = signal.signal(winch, lambda *args: self.invalidate())
+            try:
+                result = None
+                self.mode = None
+                while result is None:
+                    result = self.handle(getkey())
+            finally:
+                if winch is not None:
+                    signal.signal(winch, resize)
+                self.renderer.stop()
+                self.renderer = None
+                with self.lock:
+                    self.bookmarks.save_indexes()
+        return result
+
+    def handle(self, key):
+        result = None
+        with self.lock:
+            if key == "s":
+                if self.mode is None:
+                    self.toggle_search()
+                elif self.mode == "search_suspended":
+                    self.searchbar.toggle_show()
+                    self.toggle_search()
                 elif self.mode == "search":
+                    self.searchbar.write(key)
+            elif self.mode == "search":
+                if key == keys.ESC:
+                    self.toggle_search()
+                elif key == keys.BACKSPACE:
+                    self.searchbar.backspace()
+                elif key == keys.ENTER:
+                    self.mode = None
+                    self.focus("searchbar")
+                elif key.isalnum() or key in ["\\", "/", ".", " "]:
+                    self.searchbar.write(key)
+                else:
+                    return None
+            else:
+                if self.mode == "search_suspended":
                     if key == keys.ESC:
-                        self.toggle_search()
-                    elif key == keys.BACKSPACE:
-                        self.searchbar.backspace()
-                    elif key == keys.ENTER:
                         self.mode = None
                         self.focus("searchbar")
-                    elif key.isalnum() or key in ["\\", "/", ".", " "]:
-                        self.searchbar.write(key)
-                else:
-                    if self.mode == "search_suspended":
-                        if key == keys.ESC:
-                            self.mode = None
-                            self.focus("searchbar")
-                            self.toggle_search()
-                    try:
-                        result = self.bindings[key]()
-                    except KeyError:
-                        pass
-                    except KeyboardInterrupt:
-                        result = self.bindings[keys.CTRL_C]()
+                        self.toggle_search()
+                changed = True
+                try:
+                    result = self.bindings[key]()
+                except KeyError:
+                    changed = False
+                except KeyboardInterrupt:
+                    result = self.bindings[keys.CTRL_C]()
+                if result is None and self.mode is None:
+                    changed = self.bookmarks.refresh() or changed
+                if not changed:
+                    return result
+            self.invalidate()
         return result
 
     def stop(self):
@@ -0,0 +1,150 @@
+import os
+from itertools import repeat
+from rich.cells import get_character_cell_size
+from rich.control import Control
+from rich.segment import Segment
+
+
+def cells(line):
+    """Split a rendered line into one (text, style) pair per terminal cell.
+
+    The second cell of a wide character is ``("", style)``, and zero width
+    characters join the cell before them.
+    """
+    result = []
+    for text, style, control in line:
+        if control:
+            continue
+        if text.isascii():
+            result.extend(zip(text, repeat(style)))
+            continue
+        for char in text:
+            size = get_character_cell_size(char)
+            if size == 0 and result:
+                result[-1] = (result[-1][0] + char, result[-1][1])
+                continue
+            result.append((char, style))
+            if size == 2:
+                result.append(("", style))
+    return result
+
+
+# Moving the cursor costs about this many bytes, so unchanged cells in a
+# shorter gap are written again instead of jumped over.
+GAP = 8
+
+
+def changed_spans(old, new):
+    """Return the runs ``(start, end)`` of columns of ``new`` that differ
+    from ``old``."""
+    if len(old) != len(new):
+        return [(0, len(new))]
+    spans = []
+    for column, (before, after) in enumerate(zip(old, new)):
+        if before == after:
+            continue
+        if spans and column - spans[-1][1] <= GAP:
+            spans[-1][1] = column + 1
+        else:
+            spans.append([column, column + 1])
+    for span in spans:
+        # Never start or stop halfway through a wide character.
+        if span[0] > 0 and new[span[0]][0] == "":
+            span[0] -= 1
+        if span[1] < len(new) and new[span[1]][0] == "":
+            span[1] += 1
+    return spans
+
+
+class Screen:
+    """Draws a renderable on the alternate screen, writing only the cells
+    that changed since the last frame.
+
+    Live redraws the whole screen on each refresh, which is several
+    kilobytes for a key that moves the cursor one line. Each frame is
+    compared with the one before, line by line, and only the runs of cells
+    that changed are written, each after moving the cursor there. The bytes
+    of the last frame are kept in ``written``, and are also logged to
+    ``BOOKMARK_FRAME_LOG`` when it is set.
+    """
+
+    def __init__(self, renderable, console, log=None):
+        self.renderable = renderable
+        self.console = console
+        self.lines = None
+        self.size = None
+        self.frames = 0
+        self.written = 0
+        self.total = 0
+        if log is None:
+            log = os.getenv("BOOKMARK_FRAME_LOG")
+        self.log = open(log, "a") if log else None
+
+    def __enter__(self):
+        self.console.set_alt_screen(True)
+        self.console.show_cursor(False)
+        self.refresh()
+        return self
+
+    def __exit__(self, *exc):
+        self.console.show_cursor(True)
+        self.console.set_alt_screen(False)
+        if self.log is not None:
+            self.log.close()
+            self.log = None
+
+    def refresh(self):
+        console = self.console
+        size = console.size
+        options = console.options.update_dimensions(size.width, size.height)
+        lines = console.render_lines(self.renderable, options, pad=True)
+        output = []
+        previous = self.lines
+        if size != self.size:
+            # A resized terminal reflows what is on it, so it is redrawn.
+            output.append(str(Control.clear()))
+            previous = None
+        rows = 0
+        for row, line in enumerate(lines):
+            # Panels that did not change give the same segments, so most
+            # lines are equal without looking at their cells.
+            if previous is not None and row < len(previous):
+                if previous[row] == line:
+                    continue
+                line = cells(line)
+                spans = changed_spans(cells(previous[row]), line)
+                if not spans:
+                    continue
+            else:
+                line = cells(line)
+                spans = [(0, len(line))]
+            rows += 1
+            for start, end in spans:
+                output.append(str(Control.move_to(start, row)))
+                output.append(console._render_buffer(self.runs(line[start:end])))
+        data = "".join(output)
+        if data:
+            console.file.write(data)
+            console.file.flush()
+        self.lines = lines
+        self.size = size
+        self.frames += 1
+        self.written = len(data.encode("utf-8"))
+        self.total += self.written
+        if self.log is not None:
+            self.log.write(f"{self.frames} {self.written} {rows}\n")
+            self.log.flush()
+
+    @staticmethod
+    def runs(line):
+        # Cells are joined back into one segment per style.
+        text = []
+        style = None
+        for char, char_style in line:
+            if char_style != style and text:
+                yield Segment("".join(text), style)
+                text = []
+            style = char_style
+            text.append(char)
+        if text:
+            yield Segment("".join(text), style)
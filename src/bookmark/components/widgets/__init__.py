@@ -1,4 +1,5 @@
 from .control_tree import ControlTree
+from .preview_syntax import PreviewSyntax
 from .bookmark_dir_tree import BookmarkNode, BookmarkTree, DirNode, DirTree
 from .scroll_panel import ScrollPanel
 from .search_bar import SearchBar
@@ -7,6 +8,7 @@ from .search_bar import SearchBar
 __all__ = [
     "ScrollPanel",
     "ControlTree",
+    "PreviewSyntax",
     "BookmarkNode",
     "BookmarkTree",
     "DirNode",
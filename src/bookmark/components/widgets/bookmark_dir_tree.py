@@ -1,13 +1,182 @@
-import json
+import heapq
 import os
-from bookmark.components.widgets import ControlTree
-from bookmark.scripts import del_bookmark, ignore_element
-from bisect import bisect
-from rich.syntax import Syntax
+import time
+from bookmark.components.widgets import ControlTree, PreviewSyntax
+from bookmark.scripts import del_bookmark, ignore_element, load_bookmarks, loader
+from bookmark.scripts import frecency, health, scanner
+from bookmark.scripts.dir_index import DirIndex
+from bookmark.scripts.ignore import Ignores, escape, ignore_files
+from bookmark.scripts.watcher import WatchHub, create_watcher
 from rich.align import Align
 from rich.panel import Panel
 
 
+# Children are built this many at a time, the rest are behind a "more" node.
+PAGE = 1000
+
+
+def page(dirs, files, limit):
+    """Return the first ``limit`` sorted entries, dirs first, and the number
+    of entries left out.
+
+    Listings are not sorted, so only the entries that are shown are, with a
+    partial sort when there are more than ``limit``.
+    """
+    hidden = len(dirs) + len(files) - limit
+    if hidden <= 0:
+        return sorted(dirs), sorted(files), 0
+    dirs = heapq.nsmallest(limit, dirs)
+    files = heapq.nsmallest(limit - len(dirs), files)
+    return dirs, files, hidden
+
+
+def set_more(node, hidden):
+    more = node.more_node
+    if not hidden:
+        if more is not None:
+            node.tree.nodes.pop(more.id)
+            node.more_node = None
+        return
+    if more is None:
+        more = node.add("", style="dim", type="more", path=node.path)
+        node.more_node = more
+    else:
+        node.children.append(more)
+    more.label = f"… {hidden} more"
+    if more.under_cursor:
+        more.label = "[bold italic]" + more.label
+
+
+def show_more(node, count=PAGE):
+    node.limit += count
+    reload_children(node, recursive=False)
+
+
+# Directories that are not listed: symlinks when they are not followed,
+# other filesystems, links back to an ancestor and directories already in
+# the tree under another path.
+LINK = "link"
+MOUNT = "mount"
+LOOP = "loop"
+DUPLICATE = "duplicate"
+
+MARK_STYLES = {
+    LINK: "italic dim magenta",
+    MOUNT: "italic dim magenta",
+    LOOP: "italic yellow",
+    DUPLICATE: "italic dim magenta",
+}
+
+
+def mark_node(node, path):
+    tree = node.tree
+    try:
+        key, mark = tree.identify(path, root=node is tree)
+    except OSError:
+        return None
+    if mark is None:
+        mark = tree.visit(node, key)
+    if mark is not None:
+        node.mark = mark
+        node.style = MARK_STYLES[mark]
+        node.processed = True
+    return mark
+
+
+def populate(node, path, listing=None):
+    if mark_node(node, path) is not None:
+        return False
+    try:
+        if listing is None:
+            listing = node.tree.scan(path)
+        dirs, files = listing
+    except PermissionError:
+        node.style = "red"
+        node.permission_denied = True
+        return False
+    except (FileNotFoundError, NotADirectoryError):
+        dirs, files = [], []
+    node.ignores = node.ignores.read(path, files)
+    dirs, files, hidden = page(*node.ignores.filter(dirs, files), node.limit)
+    for dir in dirs:
+        child = node.add(
+            dir,
+            style="magenta",
+            type="dir",
+            path=f"{path}/{dir}",
+            ignores=node.ignores.child(dir),
+        )
+        child.expanded = False
+    for file in files:
+        node.add(file, style="cyan", type="file", path=f"{path}/{file}")
+    set_more(node, hidden)
+    node.processed = True
+    node.tree.watch(node)
+    return True
+
+
+def reload_children(node, recursive=True):
+    if node.type != "dir" or not node.processed or node.mark is not None:
+        return
+    try:
+        dirs, files = node.tree.scan(node.path)
+    except (PermissionError, FileNotFoundError, NotADirectoryError):
+        return
+    ignores = node.ignores
+    node.ignores = ignores.read(node.path, files)
+    rebase = node.ignores is not ignores
+    dirs, files, hidden = page(*node.ignores.filter(dirs, files), node.limit)
+    # Both the page and the children are sorted dirs followed by sorted
+    # files, so the new children are built in one pass over the page.
+    existing = {
+        (c.type, c.label[c.label.rfind("]") + 1 :]): c
+        for c in node.children
+        if c.type != "more"
+    }
+    children = []
+    added = []
+    first_id = node.tree.max_id
+    for type, names in (("dir", dirs), ("file", files)):
+        style = "magenta" if type == "dir" else "cyan"
+        for label in names:
+            child = existing.pop((type, label), None)
+            if child is None:
+                path = f"{node.path}/{label}"
+                child = node.add(
+                    label,
+                    style=style,
+                    type=type,
+                    path=path,
+                    ignores=node.ignores.child(label) if type == "dir" else None,
+                )
+                child.expanded = False
+                added.append(child)
+            elif type == "dir" and rebase:
+                child.ignores = child.ignores.rebase(node.ignores, label)
+            elif rebase:
+                child.ignores = node.ignores
+            children.append(child)
+    for removed_node in existing.values():
+        remove_subtree(node.tree, removed_node)
+    node.children = children
+    set_more(node, hidden)
+    for child in added:
+        child.process()
+    if recursive:
+        for child in children:
+            if child.id < first_id:
+                child.reload()
+
+
+def remove_subtree(tree, node):
+    stack = [node]
+    while stack:
+        removed = stack.pop()
+        stack.extend(removed.children)
+        tree.nodes.pop(removed.id)
+        tree.discard(removed)
+
+
 class BookmarkNode(ControlTree):
     def __init__(
         self,
@@ -73,9 +242,11 @@ class BookmarkNode(ControlTree):
     def toggle_expand(self):
         self.expanded = not self.expanded
 
-    def preview(self):
+    def preview(self, record=True):
+        if record:
+            frecency.visit(self.path)
         try:
-            syntax = Syntax.from_path(
+            syntax = PreviewSyntax.from_path(
                 self.path,
                 line_numbers=True,
                 word_wrap=True,
@@ -119,7 +290,7 @@ class DirNode(BookmarkNode):
         type="dir",
         id=0,
         path="",
-        ignores=[],
+        ignores=None,
     ):
         super().__init__(
             label,
@@ -138,6 +309,10 @@ class DirNode(BookmarkNode):
         self.processed = not bool(type == "dir")
         self.permission_denied = False
         self.ignores = ignores
+        self.limit = PAGE
+        self.more_node = None
+        self.key = None
+        self.mark = None
 
     def add(
         self,
@@ -151,7 +326,7 @@ class DirNode(BookmarkNode):
         tree=None,
         type="dir",
         path="",
-        ignores=[],
+        ignores=None,
     ):
         node = DirNode(
             label,
@@ -164,7 +339,7 @@ class DirNode(BookmarkNode):
             parent=self,
             id=self.tree.max_id,
             path=path,
-            ignores=self.ignores if not ignores else ignores,
+            ignores=self.ignores if ignores is None else ignores,
         )
         self.tree.max_id += 1
         self.tree.nodes[node.id] = node
@@ -174,22 +349,11 @@ class DirNode(BookmarkNode):
     def add_recursive(self, path, depth=0, max_depth=-1):
         if max_depth >= 0 and depth > max_depth:
             return
-        try:
-            dir_tree = [el for el in os.listdir(path) if el not in self.ignores]
-        except PermissionError:
-            self.style = "red"
-            self.permission_denied = True
+        if not populate(self, path):
             return
-        dirs = [dir for dir in dir_tree if os.path.isdir(f"{path}/{dir}")]
-        files = [file for file in dir_tree if file not in dirs]
-        for dir in sorted(dirs):
-            child = self.add(
-                dir, style="magenta", type="dir", expanded=False, path=f"{path}/{dir}"
-            )
-            child.add_recursive(f"{path}/{dir}", depth + 1, max_depth)
-            child.expanded = False
-        for file in sorted(files):
-            child = self.add(file, style="cyan", type="file", path=f"{path}/{file}")
+        for child in self.children:
+            if child.type == "dir":
+                child.add_recursive(child.path, depth + 1, max_depth)
 
     def process(self, depth=0, recursive=False, max_depth=-1):
         if max_depth >= 0 and depth > max_depth:
@@ -198,28 +362,14 @@ class DirNode(BookmarkNode):
             return
         elif self.type == "file":
             return
-        path = self.path
-        try:
-            dir_tree = [el for el in os.listdir(path) if el not in self.ignores]
-        except PermissionError:
-            self.style = "red"
-            self.permission_denied = True
+        if not self.processed and not populate(self, self.path):
             return
-        dirs = [dir for dir in dir_tree if os.path.isdir(f"{path}/{dir}")]
-        files = [file for file in dir_tree if file not in dirs]
-        for dir in sorted(dirs):
-            child = self.add(
-                dir, style="magenta", type="dir", expanded=False, path=f"{path}/{dir}"
-            )
-            child.expanded = False
-        for file in sorted(files):
-            child = self.add(file, style="cyan", type="file", path=f"{path}/{file}")
         if recursive:
             for child in self.children:
-                child.process(depth=depth + 1, recursive=recursive)
+                child.process(depth=depth + 1, recursive=recursive, max_depth=max_depth)
 
     def toggle_expand(self):
-        if self.permission_denied:
+        if self.permission_denied or self.mark is not None:
             return
         try:
             if not self.children[0].processed:
@@ -231,52 +381,7 @@ class DirNode(BookmarkNode):
         self.expanded = not self.expanded
 
     def reload(self):
-        if not self.children:
-            return
-        children_dict = {c.label[c.label.rfind("]") + 1 :]: c for c in self.children}
-        elements = [el for el in os.listdir(self.path) if el not in self.ignores]
-        removed_nodes = [label for label in children_dict if label not in elements]
-        added_nodes = [element for element in elements if element not in children_dict]
-        if removed_nodes:
-            for label in removed_nodes:
-                node = children_dict[label]
-                self.children.remove(node)
-                stack = [node]
-                while stack:
-                    removed = stack.pop()
-                    for child in removed.children:
-                        stack.append(child)
-                    self.tree.nodes.pop(removed.id)
-        if added_nodes:
-            dir_nodes = [
-                c.label[c.label.rfind("]") + 1 :]
-                for c in self.children
-                if c.type == "dir"
-            ]
-            file_nodes = [
-                c.label[c.label.rfind("]") + 1 :]
-                for c in self.children
-                if c.type == "file"
-            ]
-            split = len(dir_nodes)
-            for label in added_nodes:
-                path = f"{self.path}/{label}"
-                type = "dir" if os.path.isdir(path) else "file"
-                style = "magenta" if type == "dir" else "cyan"
-                self.add(label, style=style, type=type, expanded=False, path=path)
-                child = self.children.pop()
-                child.expanded = False
-                if type == "dir":
-                    insertion_point = bisect(dir_nodes, label)
-                else:
-                    insertion_point = bisect(file_nodes, label) + split
-                self.children.insert(insertion_point, child)
-                self.tree.nodes[child.id] = child
-                child.expanded = False
-                child.process()
-        for child in self.children:
-            child.ignores = self.ignores
-            child.reload()
+        reload_children(self)
 
     def expand_upward(self):
         node = self
@@ -299,6 +404,8 @@ class DirTree(ControlTree):
         app=None,
         parent=None,
         ignores=[],
+        index=None,
+        hub=None,
     ):
         super().__init__(
             label,
@@ -310,6 +417,18 @@ class DirTree(ControlTree):
             app=app,
             parent=parent,
         )
+        self.index = index
+        self.hub = hub
+        self.pending = set() if hub is None else hub.subscribe()
+        self.watched = {}
+        self.visited = {}
+        self.follow_symlinks = os.getenv("BOOKMARK_FOLLOW_SYMLINKS", "1") != "0"
+        self.one_filesystem = bool(os.getenv("BOOKMARK_ONE_FILESYSTEM"))
+        try:
+            self.dev = os.stat(label).st_dev
+        except (OSError, TypeError, ValueError):
+            self.dev = None
+        self.stale = False
         self.tree = self
         self.type = type
         self.id = 0
@@ -318,7 +437,14 @@ class DirTree(ControlTree):
         self.type = "dir"
         self.cursor = 0
         self.path = label
-        self.ignores = ignores
+        self.patterns = list(ignores)
+        self.ignores = Ignores(self.patterns, ignore_files())
+        self.processed = False
+        self.permission_denied = False
+        self.limit = PAGE
+        self.more_node = None
+        self.key = None
+        self.mark = None
 
     def add(
         self,
@@ -332,7 +458,7 @@ class DirTree(ControlTree):
         tree=None,
         type="dir",
         path="",
-        ignores=[],
+        ignores=None,
     ):
         node = DirNode(
             label,
@@ -345,7 +471,7 @@ class DirTree(ControlTree):
             parent=self,
             id=self.max_id,
             path=path,
-            ignores=self.ignores if not ignores else ignores,
+            ignores=self.ignores if ignores is None else ignores,
         )
         self.max_id += 1
         self.nodes[node.id] = node
@@ -357,41 +483,200 @@ class DirTree(ControlTree):
         self.id = 0
         self.max_id = 1
         self.nodes = {0: self}
+        self.visited = {}
         self.add_recursive(path)
-        self.cursor = self.children[0].id
+        self.cursor = self.children[0].id if self.children else 0
         cursor_node = self.nodes[self.cursor]
         cursor_node.toggle_highlight()
 
     def add_recursive(self, path, max_depth=1):
         self._add_recursive(path, max_depth=max_depth)
-        self.cursor = self.children[0].id
+        self.cursor = self.children[0].id if self.children else 0
         cursor_node = self.nodes[self.cursor]
         cursor_node.toggle_highlight()
 
     def _add_recursive(self, path, depth=0, max_depth=-1):
         if max_depth >= 0 and depth > max_depth:
             return
-        try:
-            dir_tree = [el for el in os.listdir(path) if el not in self.ignores]
-        except PermissionError:
-            self.style = "red"
-            self.permission_denied = True
+        if not populate(self, path):
             return
-        dirs = [dir for dir in dir_tree if os.path.isdir(f"{path}/{dir}")]
-        files = [file for file in dir_tree if file not in dirs]
-        for dir in sorted(dirs):
-            child = self.add(
-                dir, style="magenta", type="dir", expanded=False, path=f"{path}/{dir}"
-            )
-            child.add_recursive(f"{path}/{dir}", depth + 1, max_depth)
-            child.expanded = False
-        for file in sorted(files):
-            child = self.add(file, style="cyan", type="file", path=f"{path}/{file}")
+        for child in self.children:
+            if child.type == "dir":
+                child.add_recursive(child.path, depth + 1, max_depth)
+
+    def scan(self, path):
+        if self.index is None:
+            return scanner.scan(path, sort=False)
+        return self.index.scan(path)
+
+    def reveal(self, path):
+        """Return the node for ``path``, listing directories on the way.
+
+        Stops at the deepest existing node if ``path`` is not in the tree.
+        """
+        node = self
+        for name in os.path.relpath(path, self.path).split(os.sep):
+            if not node.processed and not populate(node, node.path):
+                return node
+            child = self.find_child(node, name)
+            if child is None and node.more_node is not None:
+                try:
+                    dirs, files = node.ignores.filter(*self.scan(node.path))
+                except OSError:
+                    return node
+                if name in dirs:
+                    position = sum(dir < name for dir in dirs)
+                else:
+                    position = len(dirs) + sum(file < name for file in files)
+                if position >= node.limit:
+                    show_more(node, position + 1 - node.limit)
+                child = self.find_child(node, name)
+            if child is None:
+                return node
+            node = child
+        return node
+
+    @staticmethod
+    def find_child(node, name):
+        for child in node.children:
+            if child.label[child.label.rfind("]") + 1 :] == name:
+                return child
+        return None
+
+    def set_ignores(self, patterns):
+        # Added patterns can only hide entries, so the tree is pruned in
+        # place. Anything else may show entries that were never listed.
+        patterns = list(patterns)
+        if patterns == self.patterns:
+            return
+        added = [p for p in patterns if p not in self.patterns]
+        pruned = set(self.patterns).issubset(patterns) and not any(
+            p.startswith("!") for p in added
+        )
+        self.patterns = patterns
+        self.ignores = self.ignores.reroot(patterns)
+        if pruned:
+            self.prune()
+        else:
+            self.stale = True
+
+    def prune(self):
+        stack = [self]
+        while stack:
+            node = stack.pop()
+            children = []
+            for child in node.children:
+                if child.type == "more":
+                    continue
+                label = child.label[child.label.rfind("]") + 1 :]
+                if node.ignores.ignored(label, child.type == "dir"):
+                    remove_subtree(self, child)
+                    continue
+                if child.type == "dir":
+                    child.ignores = child.ignores.rebase(node.ignores, label)
+                    stack.append(child)
+                else:
+                    child.ignores = node.ignores
+                children.append(child)
+            node.children = children
+            if node.more_node is not None:
+                # Entries that were not shown may now be ignored too.
+                node.children.append(node.more_node)
+                reload_children(node, recursive=False)
+
+    def save_index(self):
+        if self.index is not None:
+            self.index.save(self.path)
+
+    def watch(self, node):
+        if self.hub is None:
+            return
+        if node.path in self.watched:
+            self.hub.rearm(node.path)
+        else:
+            self.hub.add(node.path)
+        self.watched[node.path] = node
+
+    def unwatch(self, node):
+        if self.watched.get(node.path) is node:
+            del self.watched[node.path]
+            self.hub.remove(node.path)
+
+    def changes(self):
+        # Changes seen by other trees' polls are pending here as well.
+        self.hub.poll()
+        changed = set(self.pending)
+        self.pending.clear()
+        return changed
+
+    def identify(self, path, root=False):
+        """Return the ``(st_dev, st_ino)`` of the directory ``path`` and the
+        mark it gets from the symlink and filesystem settings, if any.
+
+        Safe to call from any thread.
+        """
+        if not self.follow_symlinks and not root and os.path.islink(path):
+            return None, LINK
+        stat = os.stat(path)
+        key = (stat.st_dev, stat.st_ino)
+        if self.one_filesystem and self.dev is not None and stat.st_dev != self.dev:
+            return key, MOUNT
+        return key, None
+
+    def visit(self, node, key):
+        seen = self.visited.get(key)
+        if seen is not None and seen is not node and self.nodes.get(seen.id) is seen:
+            ancestor = node.parent
+            while ancestor is not None:
+                if ancestor.key == key:
+                    return LOOP
+                ancestor = ancestor.parent
+            return DUPLICATE
+        self.visited[key] = node
+        node.key = key
+        return None
+
+    def discard(self, node):
+        self.unwatch(node)
+        if node.key is not None and self.visited.get(node.key) is node:
+            del self.visited[node.key]
+
+    def close(self):
+        self.save_index()
+        if self.hub is not None:
+            for path in self.watched:
+                self.hub.remove(path)
+            self.hub.unsubscribe(self.pending)
+            self.hub = None
+        self.watched = {}
+
+    def apply(self, changed):
+        # Parents sort before their subdirectories, so a directory removed
+        # along with its parent's entry is skipped.
+        for path in sorted(changed):
+            node = self.watched.get(path)
+            if node is None or self.nodes.get(node.id) is not node:
+                continue
+            reload_children(node, recursive=False)
+            self.watch(node)
 
     def enter(self):
         node = self.nodes[self.cursor]
         if node.type == "dir":
+            if not node.expanded:
+                frecency.visit(node.path)
             node.toggle_expand()
+        elif node.type == "more":
+            # The cursor moves to the first of the newly shown entries.
+            parent = node.parent
+            position = len(parent.children) - 1
+            show_more(parent)
+            node = self.nodes.get(self.cursor)
+            if node is not None:
+                node.toggle_highlight()
+            self.cursor = parent.children[position].id
+            self.nodes[self.cursor].under_cursor = False
+            self.nodes[self.cursor].toggle_highlight()
         else:
             node.preview()
 
@@ -399,52 +684,32 @@ class DirTree(ControlTree):
         self.expanded = not self.expanded
 
     def reload(self):
-        if not self.children:
-            return
-        children_dict = {c.label[c.label.rfind("]") + 1 :]: c for c in self.children}
-        elements = [el for el in os.listdir(self.path) if el not in self.ignores]
-        removed_nodes = [label for label in children_dict if label not in elements]
-        added_nodes = [element for element in elements if element not in children_dict]
-        if removed_nodes:
-            for label in removed_nodes:
-                node = children_dict[label]
-                self.children.remove(node)
-                stack = [node]
-                while stack:
-                    removed = stack.pop()
-                    for child in removed.children:
-                        stack.append(child)
-                    self.tree.nodes.pop(removed.id)
-        if added_nodes:
-            dir_nodes = [
-                c.label[c.label.rfind("]") + 1 :]
-                for c in self.children
-                if c.type == "dir"
-            ]
-            file_nodes = [
-                c.label[c.label.rfind("]") + 1 :]
-                for c in self.children
-                if c.type == "file"
-            ]
-            split = len(dir_nodes)
-            for label in added_nodes:
-                path = f"{self.path}/{label}"
-                type = "dir" if os.path.isdir(path) else "file"
-                style = "magenta" if type == "dir" else "cyan"
-                self.add(label, style=style, type=type, expanded=False, path=path)
-                child = self.children.pop()
-                child.expanded = False
-                if type == "dir":
-                    insertion_point = bisect(dir_nodes, label)
-                else:
-                    insertion_point = bisect(file_nodes, label) + split
-                self.children.insert(insertion_point, child)
-                self.tree.nodes[child.id] = child
-                child.expanded = False
-                child.process()
-        for child in self.children:
-            child.ignores = self.ignores
-            child.reload()
+        # Without a watcher, or when ignores were removed, every expanded
+        # directory is listed again. Otherwise only the directories the
+        # watcher saw change are.
+        if self.hub is None or self.stale:
+            if self.hub is not None:
+                self.changes()
+            self.stale = False
+            reload_children(self)
+        else:
+            self.apply(self.changes())
+        self.save_index()
+        self.check_cursor()
+
+    def refresh(self):
+        if self.hub is None:
+            return False
+        changed = self.changes()
+        if not changed:
+            return False
+        # Runs after every key, so the index is not saved here but when a
+        # tree is opened or closed, when a search walk ends and on exit.
+        self.apply(changed)
+        self.check_cursor()
+        return True
+
+    def check_cursor(self):
         if self.cursor not in self.nodes:
             self.cursor = 0
             self.nodes[self.cursor].toggle_highlight()
@@ -461,9 +726,9 @@ class DirTree(ControlTree):
         except AttributeError:
             node = self.nodes[self.cursor]
             element = node.label[node.label.rfind("]") + 1 :]
-        ignore_element(label, element)
-        self.ignores.append(element)
-        self.reload()
+        ignore_element(label, escape(element))
+        self.set_ignores(self.patterns + [escape(element)])
+        self.check_cursor()
 
 
 class BookmarkTree(ControlTree):
@@ -494,6 +759,11 @@ class BookmarkTree(ControlTree):
         self.max_id = 1
         self.nodes = {0: self}
         self.dir_trees = {}
+        # Shared by the trees of all bookmarks, so nested bookmarks list
+        # and watch their common directories once.
+        self.index = DirIndex()
+        watcher = create_watcher()
+        self.hub = None if watcher is None else WatchHub(watcher, self.index)
         self.cursor = 0
 
     def add(
@@ -526,27 +796,41 @@ class BookmarkTree(ControlTree):
         self.children.append(node)
         return node
 
-    def load_file(self, file_path):
-        with open(file_path, "r") as f:
-            json_dict = json.load(f)
-            bookmarks = json_dict["bookmarks"]
-            ignores = json_dict["ignores"]
-            dir_bookmarks = []
-            file_bookmarks = []
-            for label, path in bookmarks.items():
-                if os.path.isdir(path):
-                    dir_bookmarks.append((label, path))
-                else:
-                    file_bookmarks.append((label, path))
-            for label, path in sorted(dir_bookmarks):
-                self.add(label, style="magenta", path=path, type="dir")
-            for label, path in sorted(file_bookmarks):
-                self.add(label, path=path, type="file")
+    def load_file(self):
+        self.stamp = loader.stamp()
+        bookmarks, ignores = load_bookmarks()
+        status = health.check(list(bookmarks.values()))
+        dir_bookmarks = []
+        file_bookmarks = []
+        for label, path in bookmarks.items():
+            if status[path] == health.DIR:
+                dir_bookmarks.append((label, path))
+            else:
+                file_bookmarks.append((label, path))
+        now = time.time()
+        for label, path in sorted(dir_bookmarks, key=lambda b: self.rank(b, now)):
+            self.add(label, style="magenta", path=path, type="dir")
+        for label, path in sorted(file_bookmarks, key=lambda b: self.rank(b, now)):
+            type = status[path]
+            self.add(label, style=self.STYLES[type], path=path, type=type)
         self.ignores = ignores
         self.cursor = self.children[0].id
         cursor_node = self.nodes[self.cursor]
         cursor_node.toggle_highlight()
 
+    # Missing and slow bookmarks are listed with the files, marked by colour.
+    STYLES = {
+        health.DIR: "magenta",
+        health.FILE: "cyan",
+        health.MISSING: "red",
+        health.SLOW: "yellow",
+    }
+
+    @staticmethod
+    def rank(bookmark, now):
+        label, path = bookmark
+        return (-frecency.score(path, now), label)
+
     def cursor_up(self):
         cursor_node = self.nodes[self.cursor]
         previous_node = cursor_node.previous_node
@@ -555,12 +839,24 @@ class BookmarkTree(ControlTree):
             previous_node.toggle_highlight()
             self.cursor = previous_node.id
 
-    def enter(self):
+    def enter(self, record=True):
         node = self.nodes[self.cursor]
+        if node.type in (health.SLOW, health.MISSING):
+            # Only block on a slow target when it is explicitly opened. A
+            # missing one may have been created since it was checked.
+            status = health.classify(node.path)
+            if status != node.type:
+                health.forget([node.path])
+            node.type = status
+            node.style = self.STYLES[node.type]
+        if node.type == health.MISSING:
+            return
         if node.type == "dir":
+            if record:
+                frecency.visit(node.path)
             self.show_tree(node)
         else:
-            node.preview()
+            node.preview(record=record)
 
     def show_tree(self, node):
         dir_tree = self.dir_trees.get(node.id, None)
@@ -578,34 +874,45 @@ class BookmarkTree(ControlTree):
         except KeyError:
             pass
         if dir_tree is None:
+            self.index.load(node.path)
             dir_tree = DirTree(
                 node.path,
                 style="cyan",
                 guide_style="cyan",
                 app=self.app,
                 ignores=ignores,
+                index=self.index,
+                hub=self.hub,
             )
             dir_tree.add_recursive(node.path)
+            dir_tree.save_index()
             dir_tree.panel = self.app.layout["directory"].renderable
             dir_tree.panel.y_top = 0
             dir_tree.bookmark_name = node.label[node.label.rfind("]") + 1 :]
             self.dir_trees[node.id] = dir_tree
         else:
-            dir_tree.ignores = ignores
+            dir_tree.set_ignores(ignores)
             dir_tree.reload()
             dir_tree.center()
         self.app.layout["directory"].renderable.renderable = dir_tree
         self.app.focus("directory")
 
+    def refresh(self):
+        if loader.changed(self.stamp):
+            self.reload()
+            return True
+        dir_tree = self.app.layout["directory"].renderable.renderable
+        if isinstance(dir_tree, DirTree):
+            return dir_tree.refresh()
+        return False
+
+    def save_indexes(self):
+        for dir_tree in self.dir_trees.values():
+            dir_tree.save_index()
+
     def reload(self):
-        if os.getenv("BOOKMARK_PATH") is not None:
-            path = f"{os.getenv('BOOKMARK_PATH')}"
-        else:
-            path = f"{os.getenv('HOME')}/.bookmarks"
-        with open(path, "r") as f:
-            json_dict = json.load(f)
-            bookmarks = json_dict["bookmarks"]
-            ignores = json_dict["ignores"]
+        self.stamp = loader.stamp()
+        bookmarks, ignores = load_bookmarks()
         children_dict = {c.label[c.label.rfind("]") + 1 :]: c for c in self.children}
         removed_nodes = [label for label in children_dict if label not in bookmarks]
         added_nodes = [element for element in bookmarks if element not in children_dict]
@@ -613,40 +920,29 @@ class BookmarkTree(ControlTree):
             node = children_dict[label]
             self.children.remove(node)
             self.nodes.pop(node.id)
+        status = health.check([bookmarks[label] for label in added_nodes])
+        for label in added_nodes:
+            path = bookmarks[label]
+            type = status[path]
+            self.add(label, style=self.STYLES[type], type=type, path=path)
         if added_nodes:
-            dir_nodes = [
-                c.label[c.label.rfind("]") + 1 :]
-                for c in self.children
-                if c.type == "dir"
-            ]
-            file_nodes = [
-                c.label[c.label.rfind("]") + 1 :]
-                for c in self.children
-                if c.type == "file"
-            ]
-            split = len(dir_nodes)
-            for label in added_nodes:
-                path = bookmarks[label]
-                type = "dir" if os.path.isdir(path) else "file"
-                style = "magenta" if type == "dir" else "cyan"
-                self.add(label, style=style, type=type, path=path)
-                child = self.children.pop()
-                if type == "dir":
-                    insertion_point = bisect(dir_nodes, label)
-                else:
-                    insertion_point = bisect(file_nodes, label) + split
-                self.children.insert(insertion_point, child)
-                self.tree.nodes[child.id] = child
+            now = time.time()
+            self.children.sort(
+                key=lambda c: (
+                    c.type != "dir",
+                    self.rank((c.label[c.label.rfind("]") + 1 :], c.path), now),
+                )
+            )
         self.ignores = ignores
         selected = self.app.selected
         for id, tree in list(self.dir_trees.items()):
             if id not in self.nodes:
-                self.dir_trees.pop(id)
+                self.dir_trees.pop(id).close()
         if self.cursor not in self.nodes:
             self.cursor = self.children[0].id
             self.nodes[self.cursor].toggle_highlight()
-            self.show_tree(self.nodes[self.cursor])
-        else:
+            self.enter(record=False)
+        elif isinstance(self.app.layout["directory"].renderable.renderable, DirTree):
             node = self.nodes[self.cursor]
             ignores = []
             try:
@@ -657,8 +953,9 @@ class BookmarkTree(ControlTree):
                 ignores += self.ignores[node.label[node.label.rfind("]") + 1 :]]
             except KeyError:
                 pass
-            self.app.layout["directory"].renderable.renderable.ignores = ignores
-        self.app.layout["directory"].renderable.renderable.reload()
+            self.app.layout["directory"].renderable.renderable.set_ignores(ignores)
+        if isinstance(self.app.layout["directory"].renderable.renderable, DirTree):
+            self.app.layout["directory"].renderable.renderable.reload()
         self.app.focus(selected.name)
 
     def remove(self):
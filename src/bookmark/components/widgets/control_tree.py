@@ -1,7 +1,66 @@
+from bookmark.scripts.fenwick import Fenwick
+from rich._loop import loop_first
+from rich.segment import Segment
+from rich.style import Style, StyleStack
+from rich.styled import Styled
 from rich.tree import Tree
 
 
+class ChildList(list):
+    """The children of a node, which tell the node when they change."""
+
+    __slots__ = ("owner",)
+
+    def __init__(self, owner, children=()):
+        super().__init__(children)
+        self.owner = owner
+
+
+def _notify(name):
+    method = getattr(list, name)
+
+    def notify(self, *args, **kwargs):
+        result = method(self, *args, **kwargs)
+        self.owner.reindex()
+        return result
+
+    notify.__name__ = name
+    return notify
+
+
+for _name in (
+    "append",
+    "extend",
+    "insert",
+    "remove",
+    "pop",
+    "clear",
+    "sort",
+    "reverse",
+    "__setitem__",
+    "__delitem__",
+    "__iadd__",
+    "__imul__",
+):
+    setattr(ChildList, _name, _notify(_name))
+
+
 class ControlTree(Tree):
+    """A tree with a cursor.
+
+    Each node counts the rows it shows, itself and its expanded children,
+    and keeps a Fenwick tree over its children's counts and each child's
+    position among its siblings. Changes to the children or to ``expanded``
+    mark the counts up to the root as stale, and they are brought up to
+    date when next read. Moving the cursor and finding its line then cost
+    O(depth * log n) instead of a walk over every visible row.
+
+    ``version`` of a tree changes whenever one of its nodes does, which
+    tells a panel that its rendered lines are out of date.
+    """
+
+    version = 0
+
     def __init__(
         self,
         label,
@@ -14,6 +73,13 @@ class ControlTree(Tree):
         app=None,
         parent=None,
     ):
+        self._parent = None
+        self._expanded = expanded
+        self._rows = None
+        # Built when first needed, most nodes are leaves that never need them.
+        self._fenwick = None
+        self._stale = None
+        self._position = 0
         super().__init__(
             label,
             style=style,
@@ -45,6 +111,131 @@ class ControlTree(Tree):
         self.children.append(node)
         return node
 
+    @property
+    def label(self):
+        return self._label
+
+    @label.setter
+    def label(self, label):
+        self._label = label
+        self.changed()
+
+    @property
+    def style(self):
+        return self._style
+
+    @style.setter
+    def style(self, style):
+        self._style = style
+        self.changed()
+
+    def changed(self):
+        # While searching, nodes hang off the search tree but still belong
+        # to the tree being searched, and both show them.
+        tree = getattr(self, "tree", None)
+        if tree is not None:
+            tree.version += 1
+        parent = self._parent
+        if parent is not None:
+            parent_tree = getattr(parent, "tree", None)
+            if parent_tree is not None and parent_tree is not tree:
+                parent_tree.version += 1
+
+    @property
+    def children(self):
+        return self._children
+
+    @children.setter
+    def children(self, children):
+        self._children = ChildList(self, children)
+        self.reindex()
+
+    @property
+    def expanded(self):
+        return self._expanded
+
+    @expanded.setter
+    def expanded(self, expanded):
+        if expanded != self._expanded:
+            self._expanded = expanded
+            self.invalidate()
+            self.changed()
+
+    @property
+    def parent(self):
+        return self._parent
+
+    @parent.setter
+    def parent(self, parent):
+        old = self._parent
+        self._parent = parent
+        if old is not None and old is not parent:
+            old.reindex()
+        if parent is not None:
+            parent.reindex()
+
+    def reindex(self):
+        self._fenwick = None
+        self.invalidate()
+        self.changed()
+
+    def invalidate(self):
+        node = self
+        while True:
+            known = node._rows is not None
+            node._rows = None
+            parent = node._parent
+            if parent is None:
+                return
+            stale = parent._stale
+            if stale is None:
+                stale = parent._stale = {}
+            # Stale counts were already reported up to the root.
+            elif not known and id(node) in stale:
+                return
+            stale[id(node)] = node
+            node = parent
+
+    def fenwick(self):
+        children = self._children
+        fenwick = self._fenwick
+        if fenwick is not None and len(fenwick) == len(children):
+            stale, self._stale = self._stale, None
+            for child in (stale or {}).values():
+                position = child._position
+                if position < len(children) and children[position] is child:
+                    fenwick.set(position, child.rows())
+                elif child in children:
+                    fenwick = None
+                    break
+            else:
+                return fenwick
+        self._stale = None
+        for position, child in enumerate(children):
+            child._position = position
+        self._fenwick = Fenwick([child.rows() for child in children])
+        return self._fenwick
+
+    def rows(self):
+        if self._rows is None:
+            expanded = self._expanded and self._children
+            self._rows = 1 + self.fenwick().total if expanded else 1
+        return self._rows
+
+    def position(self, child):
+        position = child._position
+        children = self._children
+        if position < len(children) and children[position] is child:
+            return position
+        # A node can be listed by two parents while searching, so the
+        # positions are recomputed when they do not match.
+        for position, other in enumerate(children):
+            other._position = position
+        position = child._position
+        if position < len(children) and children[position] is child:
+            return position
+        return None
+
     def toggle_highlight(self):
         if self.under_cursor:
             try:
@@ -58,6 +249,7 @@ class ControlTree(Tree):
                 self.label.style = "bold italic"
                 pass
         self.under_cursor = not self.under_cursor
+        self.changed()
 
     def cursor_down(self):
         cursor_node = self.nodes[self.cursor]
@@ -148,46 +340,173 @@ class ControlTree(Tree):
     def next_sibling(self):
         if self.parent is None:
             return None
-        iter_siblings = iter(self.parent.children)
-        try:
-            for node in iter_siblings:
-                if node is self:
-                    return next(iter_siblings)
-        except StopIteration:
-            pass
-        return None
+        position = self.parent.position(self)
+        siblings = self.parent.children
+        if position is None or position + 1 >= len(siblings):
+            return None
+        return siblings[position + 1]
 
     @property
     def previous_sibling(self):
         if self.parent is None:
             return None
-        iter_siblings = iter(self.parent.children)
-        sibling = None
-
-        for node in iter_siblings:
-            if node is self:
-                return sibling
-            sibling = node
-        return None
+        position = self.parent.position(self)
+        if not position:
+            return None
+        return self.parent.children[position - 1]
 
     @property
     def cursor_line(self):
+        # The rows above a node are its parent's, the parent itself and the
+        # rows of the siblings before it.
         line = 0
-        node = self
-        while node.id != self.cursor:
-            node = node.next_node
+        node = self.nodes[self.cursor]
+        while node is not self and node.parent is not None:
+            parent = node.parent
+            position = parent.position(node)
+            if position is not None:
+                line += parent.fenwick().prefix(position)
             line += 1
+            node = parent
         return line
 
     @property
     def visible_height(self):
-        height = 0
+        return self.rows()
+
+    def path_at(self, row):
+        """Return ``(siblings, position)`` pairs leading to visible row
+        ``row``, from the root's down to the row's node."""
+        path = [([self], 0)]
         node = self
-        while node is not None:
-            node = node.next_node
-            height += 1
-        return height
+        while row:
+            row -= 1
+            fenwick = node.fenwick()
+            position = fenwick.find(row)
+            row -= fenwick.prefix(position)
+            path.append((node.children, position))
+            node = node.children[position]
+        return path
+
+    def window(self, start, count):
+        return TreeWindow(self, start, count)
 
     @property
     def cursor_path(self):
         return self.nodes[self.cursor].path
+
+
+SPACE, CONTINUE, FORK, END = range(4)
+ASCII_GUIDES = ("    ", "|   ", "+-- ", "`-- ")
+TREE_GUIDES = [
+    ("    ", "│   ", "├── ", "└── "),
+    ("    ", "┃   ", "┣━━ ", "┗━━ "),
+    ("    ", "║   ", "╠══ ", "╚══ "),
+]
+
+
+class TreeWindow:
+    """``count`` lines of a tree from line ``start``, rendered as they are
+    when rich renders the whole tree.
+
+    The guides and styles of the first row are rebuilt from its ancestors,
+    so a frame costs the same wherever the window is.
+    """
+
+    def __init__(self, tree, start, count):
+        self.tree = tree
+        self.start = start
+        self.count = count
+
+    def __rich_console__(self, console, options):
+        tree = self.tree
+        get_style = console.get_style
+        null_style = Style.null()
+        new_line = Segment.line()
+        remove_guide_styles = Style(bold=False, underline2=False)
+
+        def make_guide(index, style):
+            if options.ascii_only:
+                line = ASCII_GUIDES[index]
+            else:
+                guide = 1 if style.bold else (2 if style.underline2 else 0)
+                line = TREE_GUIDES[0 if options.legacy_windows else guide][index]
+            return Segment(line, style)
+
+        row = self.start + (1 if tree.hide_root else 0)
+        if self.count <= 0 or row >= tree.rows():
+            return
+        levels = [make_guide(CONTINUE, get_style(tree.guide_style, default="") or null_style)]
+        guide_style_stack = StyleStack(get_style(tree.guide_style))
+        style_stack = StyleStack(get_style(tree.style))
+        stack = []
+        path = tree.path_at(row)
+        for siblings, position in path[:-1]:
+            # What rich does on its way down to the first row.
+            node = siblings[position]
+            last = position == len(siblings) - 1
+            stack.append((siblings, position + 1))
+            guide_style = guide_style_stack.current + get_style(node.guide_style)
+            levels[-1] = make_guide(SPACE if last else CONTINUE, levels[-1].style or null_style)
+            levels.append(make_guide(END if len(node.children) == 1 else FORK, guide_style))
+            style_stack.push(get_style(node.style))
+            guide_style_stack.push(get_style(node.guide_style))
+        siblings, position = path[-1]
+        stack.append((siblings, position))
+        lines = 0
+        while stack:
+            siblings, position = stack[-1]
+            if position >= len(siblings):
+                stack.pop()
+                levels.pop()
+                if levels:
+                    guide_style = levels[-1].style or null_style
+                    levels[-1] = make_guide(FORK, guide_style)
+                    guide_style_stack.pop()
+                    style_stack.pop()
+                continue
+            stack[-1] = (siblings, position + 1)
+            node = siblings[position]
+            last = position == len(siblings) - 1
+            if last:
+                levels[-1] = make_guide(END, levels[-1].style or null_style)
+            guide_style = guide_style_stack.current + get_style(node.guide_style)
+            style = style_stack.current + get_style(node.style)
+            prefix = levels[(2 if tree.hide_root else 1) :]
+            renderable_lines = console.render_lines(
+                Styled(node.label, style),
+                options.update(
+                    width=options.max_width
+                    - sum(level.cell_length for level in prefix),
+                    highlight=tree.highlight,
+                    height=None,
+                ),
+                pad=options.justify is not None,
+            )
+            if not (node is tree and tree.hide_root):
+                for first, line in loop_first(renderable_lines):
+                    if prefix:
+                        yield from Segment.apply_style(
+                            prefix,
+                            style.background_style,
+                            post_style=remove_guide_styles,
+                        )
+                    yield from line
+                    yield new_line
+                    lines += 1
+                    if lines >= self.count:
+                        return
+                    if first and prefix:
+                        prefix[-1] = make_guide(
+                            SPACE if last else CONTINUE, prefix[-1].style or null_style
+                        )
+            if node.expanded and node.children:
+                levels[-1] = make_guide(
+                    SPACE if last else CONTINUE, levels[-1].style or null_style
+                )
+                levels.append(
+                    make_guide(END if len(node.children) == 1 else FORK, guide_style)
+                )
+                style_stack.push(get_style(node.style))
+                guide_style_stack.push(get_style(node.guide_style))
+                stack.append((node.children, 0))
@@ -0,0 +1,111 @@
+import textwrap
+from rich.syntax import Syntax
+from rich.text import Text
+
+
+class PreviewSyntax(Syntax):
+    """A Syntax that is lexed once and can render a window of its lines.
+
+    Syntax lexes and splits the whole file on each render, so the cost of
+    a frame grows with the file. ``window`` renders only the lines shown,
+    from the tokens of the first lexing.
+    """
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.spans = None
+        self.number_width = None
+        self.lines = None
+        self.lexed = False
+
+    def tokenize(self):
+        # The same steps as Syntax.__rich_console__, with one list of
+        # (text, style) spans per line.
+        if self.lines is not None:
+            return
+        # Counting the lines of the file is as slow as lexing it, so the
+        # width of the numbers is kept with the lines.
+        self.number_width = super()._numbers_column_width
+        code = self.code if self.code.endswith("\n") else self.code + "\n"
+        code = textwrap.dedent(code) if self.dedent else code
+        code = code.expandtabs(self.tab_size)
+        lexer = self.lexer
+        self.lexed = lexer is not None
+        if lexer is None:
+            self.lines = [[(line + "\n", None)] for line in code.split("\n")[:-1]]
+        else:
+            get_style = self._theme.get_style_for_token
+            lines = []
+            line = []
+            for token_type, token in lexer.get_tokens(code):
+                style = get_style(token_type)
+                while token:
+                    part, new_line, token = token.partition("\n")
+                    line.append((part + new_line, style))
+                    if new_line:
+                        lines.append(line)
+                        line = []
+            if line:
+                lines.append(line)
+            self.lines = lines
+
+    def window(self, start, count):
+        """Return a Syntax of ``count`` lines, ``start`` lines below the
+        first line shown, or None if the code is shown without lines."""
+        if not self.line_numbers and not self.word_wrap and not self.line_range:
+            return None
+        self.tokenize()
+        first, end = self.line_range or (None, None)
+        first = max(0, first - 1) if first else 0
+        first += start
+        ends_on_nl = self.code.endswith("\n")
+        # Past the last line there is only the blank line after a final
+        # newline.
+        if first > len(self.lines) or (first == len(self.lines) and not ends_on_nl):
+            return Text("")
+        stop = first + count if end is None else min(first + count, end)
+        lines = self.lines[first:stop]
+        code = "".join(text for line in lines for text, style in line)
+        if stop >= len(self.lines) and not ends_on_nl:
+            code = code[:-1]
+        window = PreviewSyntax(
+            code,
+            self._lexer,
+            theme=self._theme,
+            line_numbers=self.line_numbers,
+            start_line=self.start_line + first,
+            highlight_lines=self.highlight_lines,
+            code_width=self.code_width,
+            tab_size=self.tab_size,
+            word_wrap=self.word_wrap,
+            background_color=self.background_color,
+            indent_guides=self.indent_guides,
+        )
+        window.spans = lines
+        window.lexed = self.lexed
+        window.number_width = self.number_width
+        return window
+
+    @property
+    def _numbers_column_width(self):
+        if self.number_width is not None:
+            return self.number_width
+        return super()._numbers_column_width
+
+    def highlight(self, code, line_range=None):
+        if self.spans is None:
+            return super().highlight(code, line_range)
+        base_style = self._get_base_style()
+        text = Text(
+            justify="default" if base_style.transparent_background else "left",
+            style=base_style,
+            tab_size=self.tab_size,
+            no_wrap=not self.word_wrap,
+        )
+        if not self.lexed:
+            text.append(code)
+            return text
+        text.append_tokens(span for line in self.spans for span in line)
+        if self.background_color is not None:
+            text.stylize(f"on {self.background_color}")
+        return text
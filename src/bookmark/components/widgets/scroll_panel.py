@@ -1,5 +1,6 @@
 import os
 from bookmark.components.widgets import BookmarkTree, DirTree
+from bookmark.scripts import frecency
 from rich.segment import Segment
 from rich.syntax import Syntax
 from rich.align import Align
@@ -46,6 +47,8 @@ class ScrollPanel(Panel):
         self.focused = False
         self.y_top = 0
         self.app = app
+        self.cached_key = None
+        self.cached = None
 
     def toggle_focus(self):
         if self.focused:
@@ -99,6 +102,7 @@ class ScrollPanel(Panel):
             path = renderable.path
         else:
             path = renderable.cursor_path
+        frecency.visit(path)
         self.app.mode = None
         self.app.focus("searchbar")
         self.app.toggle_search()
@@ -112,8 +116,15 @@ class ScrollPanel(Panel):
             path = renderable.cursor_path
         if not os.path.isdir(path):
             path = os.path.dirname(path)
+        frecency.visit(path)
+        cd_file = os.getenv("BM_CD_FILE")
+        if cd_file:
+            # The bm shell function changes directory once the dashboard exits.
+            with open(cd_file, "w") as f:
+                f.write(path)
+            return 0
         os.chdir(path)
-        return "exec /bin/zsh"
+        return f"exec {os.getenv('SHELL', '/bin/zsh')}"
 
     def remove(self):
         renderable = self.renderable
@@ -133,11 +144,52 @@ class ScrollPanel(Panel):
     def actual_height(self):
         return self.app.layout.map[self.layout].region.height
 
+    def cache_key(self, options):
+        # Trees bump their version whenever a node changes, and a preview
+        # scrolls by its line_range. Anything else is replaced, not changed.
+        renderable = self.renderable
+        return (
+            renderable,
+            getattr(renderable, "version", None),
+            getattr(renderable, "line_range", None),
+            self.y_top,
+            self.title,
+            self.subtitle,
+            self.border_style,
+            self.style,
+            self.box,
+            self.padding,
+            self.width,
+            self.height,
+            options.max_width,
+            options.height,
+            options.ascii_only,
+            options.legacy_windows,
+        )
+
     def __rich_console__(self, console, options):
+        # The layout renders every panel on each frame, so panels that did
+        # not change reuse the segments of their last render.
+        key = self.cache_key(options)
+        if key != self.cached_key:
+            self.cached = list(self.render(console, options))
+            self.cached_key = key
+        return iter(self.cached)
+
+    def render(self, console, options):
         _padding = Padding.unpack(self.padding)
-        renderable = (
-            Padding(self.renderable, _padding) if any(_padding) else self.renderable
-        )
+        child_height = self.height or options.height or None
+        if child_height:
+            child_height -= 2
+        # Renderables with a window only render the lines that are shown.
+        window = getattr(self.renderable, "window", None)
+        if window is not None and child_height:
+            renderable = window(self.y_top, child_height)
+            y_top = 0
+        if window is None or not child_height or renderable is None:
+            renderable = self.renderable
+            y_top = self.y_top
+        renderable = Padding(renderable, _padding) if any(_padding) else renderable
         style = console.get_style(self.style)
         border_style = style + console.get_style(self.border_style)
         width = (
@@ -160,9 +212,6 @@ class ScrollPanel(Panel):
                 renderable, options=options.update_width(width - 2)
             ).maximum
         )
-        child_height = self.height or options.height or None
-        if child_height:
-            child_height -= 2
         if title_text is not None:
             child_width = min(
                 options.max_width - 2, max(child_width, title_text.cell_len + 2)
@@ -171,11 +220,11 @@ class ScrollPanel(Panel):
         width = child_width + 2
         child_options = options.update(
             width=child_width,
-            height=child_height + self.y_top,
+            height=child_height + y_top,
             highlight=self.highlight,
         )
         lines = console.render_lines(renderable, child_options, style=style)
-        lines = lines[self.y_top : child_height + self.y_top]
+        lines = lines[y_top : child_height + y_top]
 
         line_start = Segment(box.mid_left, border_style)
         line_end = Segment(f"{box.mid_right}", border_style)
@@ -1,5 +1,10 @@
-from bookmark.components.widgets import BookmarkTree, DirTree
+from bookmark.components.widgets import BookmarkTree, DirNode, DirTree
+from bookmark.components.widgets.bookmark_dir_tree import DUPLICATE, MARK_STYLES
+from bookmark.scripts import frecency
+from bookmark.scripts.node_store import MARKED, Entry, NodeStore
 from bookmark.scripts.search import search
+from bookmark.scripts.walker import Walker
+import itertools
 import os
 from rich.box import ROUNDED
 from rich.panel import Panel
@@ -9,14 +14,24 @@ from rich.text import Text
 class SearchDirTree(DirTree):
     def enter(self):
         layout = self.app.layout["searchbar"]
+        self.bar.stop_walker()
         for node in self.bar.old_tree.nodes.values():
             node.label = self.bar.old_labels[node.id]
             node.parent = self.bar.old_parents[node.id]
-        self.bar.old_tree.cursor = self.bar.searchtree.cursor
-        self.bar.searchtree.nodes[self.bar.searchtree.cursor].toggle_highlight()
+        selected = self.bar.searchtree.nodes[self.bar.searchtree.cursor]
+        if selected.id < 0:
+            # Found by the walker, so the node is only built now.
+            selected.toggle_highlight()
+            self.bar.old_tree.cursor = self.bar.old_tree.reveal(selected.path).id
+        else:
+            self.bar.old_tree.cursor = selected.id
+            selected.toggle_highlight()
         self.bar.old_tree.nodes[self.bar.old_tree.cursor].under_cursor = False
         self.bar.old_tree.nodes[self.bar.old_tree.cursor].toggle_highlight()
-        self.bar.old_tree.nodes[self.bar.old_tree.cursor].toggle_expand()
+        node = self.bar.old_tree.nodes[self.bar.old_tree.cursor]
+        if node.type == "dir" and not node.expanded:
+            frecency.visit(node.path)
+        node.toggle_expand()
         self.bar.old_tree.nodes[self.bar.old_tree.cursor].expand_upward()
         self.bar.old_tree.center()
         layout.visible = False
@@ -67,6 +82,12 @@ class SearchBar(Panel):
         self.text = Text("")
         self.renderable = self.text
         self.focused = False
+        self.walker = None
+        self.store = None
+        self.results = {}
+        self.grown = False
+        self.cached_key = None
+        self.cached = None
 
     def write(self, letter):
         self.text.plain += letter
@@ -77,7 +98,7 @@ class SearchBar(Panel):
         self.show_results(self.text.plain, backspace=True)
 
     def strip_labels(self):
-        for node in self.nodes.values():
+        for node in list(self.nodes.values()) + list(self.results.values()):
             if isinstance(node.label, Text):
                 node.label = node.label.plain
             else:
@@ -89,6 +110,9 @@ class SearchBar(Panel):
     def toggle_show(self):
         layout = self.app.layout["searchbar"]
         if layout.visible:
+            self.stop_walker()
+            self.store = None
+            self.results = {}
             for node in self.old_tree.nodes.values():
                 node.label = self.old_labels[node.id]
                 node.parent = self.old_parents[node.id]
@@ -109,19 +133,19 @@ class SearchBar(Panel):
                 searchtree.panel = self.app.layout["bookmarks"].renderable
                 searchtree.panel.y_top = 0
             else:
-                if tree.label != os.getenv("HOME"):
-                    tree.process(recursive=True, max_depth=4)
                 searchtree = SearchDirTree(
                     tree.label,
                     style="cyan",
                     guide_style="cyan",
                     app=self.app,
-                    ignores=tree.ignores,
+                    ignores=tree.patterns,
                 )
                 searchtree.panel = self.app.layout["directory"].renderable
                 searchtree.panel.y_top = 0
                 searchtree.bar = self
-            searchtree.children = list(tree.nodes.values())[1:]
+            searchtree.children = [
+                node for node in list(tree.nodes.values())[1:] if node.type != "more"
+            ]
             searchtree.nodes = {node.id: node for node in searchtree.children}
             self.old_tree = tree
             self.old_labels = {
@@ -139,8 +163,158 @@ class SearchBar(Panel):
                 self.searchtree.nodes[self.searchtree.cursor].toggle_highlight()
             except IndexError:
                 pass
+            if isinstance(tree, DirTree) and tree.label != os.getenv("HOME"):
+                self.start_walker(tree)
         self.clear()
 
+    def start_walker(self, tree):
+        # Directories below the already built nodes are listed in the
+        # background into a NodeStore, and become searchable as soon as
+        # they are attached. Tree nodes are only built for the results.
+        self.store = NodeStore()
+        self.results = {}
+        self.seen = set(tree.visited)
+        roots = []
+        stack = [(tree, -1)]
+        while stack:
+            node, depth = stack.pop()
+            if node.type != "dir" or depth > self.MAX_DEPTH:
+                continue
+            if node.processed:
+                stack.extend((child, depth + 1) for child in node.children)
+            if not node.processed or node.more_node is not None:
+                # Entries of a paged directory that are not shown yet are
+                # found by listing it again, skipping the built ones.
+                built = {
+                    child.label[child.label.rfind("]") + 1 :]
+                    for child in node.children
+                }
+                key = (self.store.add_base(node.path), node.ignores, built)
+                roots.append((key, node.path, depth))
+        self.walker = Walker(
+            roots,
+            self.attach,
+            max_depth=self.MAX_DEPTH,
+            lock=self.app.lock,
+            on_done=self.walk_done,
+            scan=self.scan,
+        )
+        self.title = "Scanning..."
+        self.walker.start()
+
+    MAX_DEPTH = 4
+
+    def stop_walker(self):
+        if self.walker is not None:
+            self.walker.cancel()
+            self.walker = None
+        self.title = None
+
+    def scan(self, path):
+        # Runs on the walker's workers.
+        key, mark = self.old_tree.identify(path)
+        if mark is not None:
+            return key, mark, None
+        return key, None, self.old_tree.scan(path)
+
+    def attach(self, key, path, listing):
+        if listing is None:
+            return ()
+        parent, ignores, built = key
+        key, mark, listing = listing
+        # Paged directories come with their built entries, and are already
+        # in the tree.
+        if mark is None and not built:
+            if key in self.seen:
+                mark = DUPLICATE
+            else:
+                self.seen.add(key)
+        if mark is not None:
+            if parent >= 0:
+                self.store.flags[parent] |= MARKED
+            return ()
+        dirs, files = listing
+        ignores = ignores.read(path, files)
+        dirs, files = ignores.filter(dirs, files)
+        if built:
+            dirs = [dir for dir in dirs if dir not in built]
+            files = [file for file in files if file not in built]
+        first = self.store.add_listing(parent, dirs, files)
+        self.grown = True
+        self.title = f"Scanning... {self.walker.scanned} directories"
+        self.app.invalidate()
+        return [
+            ((first + i, ignores.child(dir), ()), f"{path}/{dir}")
+            for i, dir in enumerate(dirs)
+        ]
+
+    def walk_done(self):
+        self.title = f"{self.candidate_count} entries"
+        self.app.invalidate()
+        self.old_tree.save_index()
+
+    @property
+    def candidate_count(self):
+        return len(self.nodes) + (len(self.store) if self.store is not None else 0)
+
+    def node(self, id):
+        return self.results[id] if id < 0 else self.nodes[id]
+
+    def candidates(self):
+        # Store entries are viewed one at a time as the search reaches them,
+        # and the search keeps one view per distinct label.
+        nodes = list(self.nodes.values())
+        if self.store is None:
+            return nodes
+        return itertools.chain(nodes, self.store.entries())
+
+    def display(self, node):
+        # Entries from the store get a detached node, numbered below zero
+        # so they cannot clash with the ids of the tree being searched.
+        if not isinstance(node, Entry):
+            return node
+        id = -1 - node.index
+        result = self.results.get(id)
+        if result is None:
+            type = node.type
+            result = DirNode(
+                node.label,
+                style=(
+                    MARK_STYLES[DUPLICATE]
+                    if node.marked
+                    else "magenta" if type == "dir" else "cyan"
+                ),
+                guide_style="cyan",
+                app=self.app,
+                parent=self.searchtree,
+                tree=self.searchtree,
+                type=type,
+                id=id,
+                path=node.path,
+            )
+            result.processed = True
+            self.results[id] = result
+        return result
+
+    def __rich_console__(self, console, options):
+        # Only the text, the title and the focus change the bar, and the
+        # other panels are redrawn far more often than it is.
+        key = (
+            self.text.plain,
+            self.title,
+            self.subtitle,
+            self.border_style,
+            self.style,
+            options.max_width,
+            options.height,
+            options.ascii_only,
+            options.legacy_windows,
+        )
+        if key != self.cached_key:
+            self.cached = list(super().__rich_console__(console, options))
+            self.cached_key = key
+        return iter(self.cached)
+
     def toggle_focus(self):
         if self.focused:
             self.border_style = "blue"
@@ -155,21 +329,22 @@ class SearchBar(Panel):
             self.searchtree.children = list(self.nodes.values())
             self.searchtree.nodes = {node.id: node for node in self.searchtree.children}
             try:
-                self.nodes[self.searchtree.cursor].toggle_highlight()
+                self.node(self.searchtree.cursor).toggle_highlight()
                 self.searchtree.cursor = self.searchtree.children[0].id
                 self.searchtree.nodes[self.searchtree.cursor].under_cursor = False
                 self.searchtree.nodes[self.searchtree.cursor].toggle_highlight()
             except IndexError:
                 pass
             return
-        elif backspace:
-            nodes = search(pattern, self.nodes.values(), fzf_path=self.app.fzf_path)
+        elif backspace or self.grown:
+            self.grown = False
+            nodes = search(pattern, self.candidates(), fzf_path=self.app.fzf_path)
         else:
             nodes = search(pattern, self.searchtree.nodes.values(), fzf_path=self.app.fzf_path)
-        self.searchtree.children = nodes
+        self.searchtree.children = [self.display(node) for node in nodes]
         self.searchtree.nodes = {node.id: node for node in self.searchtree.children}
         try:
-            self.nodes[self.searchtree.cursor].toggle_highlight()
+            self.node(self.searchtree.cursor).toggle_highlight()
             self.searchtree.cursor = self.searchtree.children[0].id
             self.searchtree.nodes[self.searchtree.cursor].under_cursor = False
             self.searchtree.nodes[self.searchtree.cursor].toggle_highlight()
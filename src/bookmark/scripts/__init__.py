@@ -1,4 +1,4 @@
-from .manage_bookmarks import add_bookmark, del_bookmark, list_bookmarks, ignore_element, check_file, reset_file
+from .manage_bookmarks import add_bookmark, bookmark_target, del_bookmark, list_bookmarks, write_bookmarks, import_bookmarks, diagnose_bookmarks, prune_bookmarks, ignore_element, check_file, reset_file, load_store, load_bookmarks
 
 
 # __all__ = ["add_bookmark", "del_bookmark", "list_bookmarks"]
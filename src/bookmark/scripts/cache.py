@@ -0,0 +1,129 @@
+import bisect
+import fcntl
+import os
+import tempfile
+from contextlib import contextmanager
+from bookmark.scripts import loader
+
+
+def cache_dir():
+    if os.getenv("BOOKMARK_CACHE_DIR") is not None:
+        path = os.getenv("BOOKMARK_CACHE_DIR")
+    elif os.getenv("XDG_CACHE_HOME"):
+        path = os.path.join(os.getenv("XDG_CACHE_HOME"), "bookmark")
+    else:
+        path = os.path.join(os.getenv("HOME"), ".cache", "bookmark")
+    os.makedirs(path, exist_ok=True)
+    return path
+
+
+def lookup_path():
+    return os.path.join(cache_dir(), "paths")
+
+
+def names_path():
+    return os.path.join(cache_dir(), "names")
+
+
+@contextmanager
+def locked():
+    # Held around every rewrite of the lookup files, so writers in other
+    # processes apply their changes one after the other.
+    with open(lookup_path() + ".lock", "a") as lock:
+        fcntl.flock(lock, fcntl.LOCK_EX)
+        yield
+
+
+def write_atomic(path, data):
+    fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path), prefix=".tmp-")
+    try:
+        with os.fdopen(fd, "w") as f:
+            f.write(data)
+        os.replace(tmp_path, path)
+    except BaseException:
+        os.unlink(tmp_path)
+        raise
+
+
+def valid(name, path):
+    # Tabs and newlines would break the one-line-per-bookmark format that the
+    # shell functions read with awk.
+    return not any(c in name + path for c in "\t\n")
+
+
+def write_lookup(bookmarks=None):
+    with locked():
+        _write_lookup(bookmarks)
+
+
+def _write_lookup(bookmarks=None):
+    if bookmarks is None:
+        bookmarks = loader.load()[0]
+    entries = [
+        (name, path) for name, path in sorted(bookmarks.items()) if valid(name, path)
+    ]
+    write_atomic(lookup_path(), "".join(f"{n}\t{p}\n" for n, p in entries))
+    write_atomic(names_path(), "".join(f"{n}\n" for n, p in entries))
+
+
+# Changes bigger than this are merged into a dict and sorted again.
+BATCH = 64
+
+
+def update_lookup(added=(), removed=()):
+    """Apply one change to the lookup files, without loading the store."""
+    if not added and not removed:
+        return
+    with locked():
+        _update_lookup(added, removed)
+
+
+def _update_lookup(added, removed):
+    try:
+        with open(lookup_path(), "r") as f:
+            lines = f.readlines()
+        with open(names_path(), "r") as f:
+            names = f.read().splitlines()
+    except FileNotFoundError:
+        _write_lookup()
+        return
+    if len(lines) != len(names):
+        _write_lookup()
+        return
+    if len(added) + len(removed) > BATCH:
+        bookmarks = dict(line.rstrip("\n").split("\t", 1) for line in lines)
+        for name in removed:
+            bookmarks.pop(name, None)
+        bookmarks.update(added)
+        _write_lookup(bookmarks)
+        return
+    # Both files are sorted by name, so each change is one line found by
+    # bisection.
+    for name in list(removed) + [name for name, path in added]:
+        i = bisect.bisect_left(names, name)
+        if i < len(names) and names[i] == name:
+            del names[i]
+            del lines[i]
+    for name, path in added:
+        if valid(name, path):
+            i = bisect.bisect_left(names, name)
+            names.insert(i, name)
+            lines.insert(i, f"{name}\t{path}\n")
+    write_atomic(lookup_path(), "".join(lines))
+    write_atomic(names_path(), "".join(f"{n}\n" for n in names))
+
+
+def resolve(name):
+    path = lookup_path()
+    if not os.path.exists(path) or not os.path.exists(names_path()):
+        write_lookup()
+    with open(path, "r") as f:
+        for line in f:
+            entry, _, target = line.rstrip("\n").partition("\t")
+            if entry == name:
+                return target
+    # The store may have been edited without going through bm.
+    target = loader.load()[0].get(name)
+    if target is not None:
+        write_lookup()
+    return target
@@ -1,30 +1,45 @@
 import os
-from bookmark.components import App
-from rich import print
+import sys
 from bookmark.scripts import (
     add_bookmark,
+    bookmark_target,
     del_bookmark,
     list_bookmarks,
+    write_bookmarks,
+    import_bookmarks,
+    diagnose_bookmarks,
+    prune_bookmarks,
     check_file,
     reset_file,
 )
-import rich_click as click
-
-click.rich_click.STYLE_ERRORS_SUGGESTION = "blue italic"
-click.rich_click.ERRORS_SUGGESTION = "Try running the --help flag for more information"
-click.rich_click.MAX_WIDTH = 100
-# click.rich_click.OPTION_GROUPS = {
-#     "bm": [
-#         {"open": ["-r"]},
-#         # {"name": "Advanced Usage", "options": ["-r", "-h"]},
-#     ]
-# }
-click.rich_click.COMMAND_GROUPS = {
-    "bm": [
-        {"name": "Dashboard", "commands": ["open"]},
-        {"name": "Bookmark management", "commands": ["add", "rm", "list"]},
-    ]
-}
+
+# rich-click alone costs more to import than everything bm add/rm needs, so
+# scripts and shell hooks (BM_PLAIN=1, or stdout not a terminal) get plain click.
+PLAIN = bool(os.getenv("BM_PLAIN")) or not sys.stdout.isatty()
+if PLAIN:
+    import click
+else:
+    import rich_click as click
+
+    click.rich_click.STYLE_ERRORS_SUGGESTION = "blue italic"
+    click.rich_click.ERRORS_SUGGESTION = (
+        "Try running the --help flag for more information"
+    )
+    click.rich_click.MAX_WIDTH = 100
+    # click.rich_click.OPTION_GROUPS = {
+    #     "bm": [
+    #         {"open": ["-r"]},
+    #         # {"name": "Advanced Usage", "options": ["-r", "-h"]},
+    #     ]
+    # }
+    click.rich_click.COMMAND_GROUPS = {
+        "bm": [
+            {"name": "Dashboard", "commands": ["open"]},
+            {"name": "Bookmark management", "commands": ["add", "rm", "list", "doctor"]},
+            {"name": "Import and export", "commands": ["import", "export"]},
+            {"name": "Shell integration", "commands": ["path", "init"]},
+        ]
+    }
 
 
 @click.group(
@@ -58,9 +73,11 @@ def cli(ctx, reset, help):
     if reset:
         reset_file()
         ctx.exit()
-    else:
-        file_status = check_file()
-    if file_status == "empty" and ctx.invoked_subcommand in [None, "open"]:
+    elif ctx.invoked_subcommand not in [None, "open"]:
+        # Only the dashboard needs the whole store up front. The other
+        # commands read what they need and report an invalid file themselves.
+        return
+    if check_file() == "empty":
         click.echo(
             "You have added no bookmarks. To show the bookmark dashboard, add a bookmark first."
         )
@@ -83,12 +100,14 @@ def open(ctx, help):
         click.echo(ctx.get_help())
         ctx.exit()
     else:
+        from bookmark.components import App
+
         app = App()
         exit_code = app.run()
         while exit_code != 0:
             if isinstance(exit_code, str):
                 os.system(exit_code)
-            if exit_code == "exec /bin/zsh":
+            if isinstance(exit_code, str) and exit_code.startswith("exec "):
                 exit_code = 0
             else:
                 exit_code = app.run(init=False)
@@ -196,12 +215,208 @@ def rm(ctx, name_arg, name_opt, help):
 
 @cli.command(options_metavar="<options>")
 @click.pass_context
+@click.option(
+    "-f",
+    "--format",
+    "fmt",
+    metavar="<format>",
+    type=click.Choice(["table", "tsv", "json", "ndjson", "names"]),
+    default="table",
+    show_default=True,
+    help="Output format. Everything but table is streamed without rich",
+)
+@click.option(
+    "--no-classify",
+    is_flag=True,
+    default=False,
+    help="Don't check whether bookmarks point to directories or files",
+)
 @click.option(
     "-h", "--help", is_flag=True, default=False, help="Show this message and exit"
 )
-def list(ctx, help):
+def list(ctx, fmt, no_classify, help):
     """List all bookmarks"""
     if help:
         click.echo(ctx.get_help())
         ctx.exit()
+    if fmt != "table":
+        write_bookmarks(fmt, classify=not no_classify)
+        return
+    from rich import print
+
     print(list_bookmarks())
+
+
+@cli.command("import", options_metavar="<options>")
+@click.pass_context
+@click.argument(
+    "file",
+    required=False,
+    default="-",
+    metavar="<file>",
+    type=click.File("r"),
+)
+@click.option(
+    "-f",
+    "--format",
+    "fmt",
+    metavar="<format>",
+    type=click.Choice(["tsv", "json", "ndjson", "cdpath"]),
+    default="tsv",
+    show_default=True,
+    help="Input format. cdpath reads colon separated directories",
+)
+@click.option(
+    "-c",
+    "--conflict",
+    metavar="<policy>",
+    type=click.Choice(["skip", "overwrite", "rename"]),
+    default="skip",
+    show_default=True,
+    help="What to do with names that are already bookmarked",
+)
+@click.option(
+    "--no-validate",
+    is_flag=True,
+    default=False,
+    help="Import paths without checking that they exist",
+)
+@click.option(
+    "-h", "--help", is_flag=True, default=False, help="Show this message and exit"
+)
+def import_(ctx, file, fmt, conflict, no_validate, help):
+    """Add bookmarks from <file>, or stdin, in a single write"""
+    if help:
+        click.echo(ctx.get_help())
+        ctx.exit()
+    imported, invalid = import_bookmarks(
+        file, fmt=fmt, policy=conflict, validate=not no_validate
+    )
+    for name, path in invalid:
+        click.echo(f"Skipped {name}: {path} does not exist", err=True)
+    click.echo(f"Imported {len(imported)} bookmark(s)", err=True)
+
+
+@cli.command(options_metavar="<options>")
+@click.pass_context
+@click.argument(
+    "file",
+    required=False,
+    default="-",
+    metavar="<file>",
+    type=click.File("w"),
+)
+@click.option(
+    "-f",
+    "--format",
+    "fmt",
+    metavar="<format>",
+    type=click.Choice(["tsv", "json", "ndjson", "names"]),
+    default="tsv",
+    show_default=True,
+    help="Output format",
+)
+@click.option(
+    "-h", "--help", is_flag=True, default=False, help="Show this message and exit"
+)
+def export(ctx, file, fmt, help):
+    """Write all bookmarks to <file>, or stdout"""
+    if help:
+        click.echo(ctx.get_help())
+        ctx.exit()
+    write_bookmarks(fmt, classify=False, file=file)
+
+
+@cli.command(options_metavar="<options>")
+@click.pass_context
+@click.option(
+    "-t",
+    "--timeout",
+    metavar="<seconds>",
+    type=click.FLOAT,
+    default=1.0,
+    show_default=True,
+    help="How long to wait for slow paths",
+)
+@click.option(
+    "-p",
+    "--prune",
+    is_flag=True,
+    default=False,
+    help="Remove missing bookmarks without asking",
+)
+@click.option(
+    "-h", "--help", is_flag=True, default=False, help="Show this message and exit"
+)
+def doctor(ctx, timeout, prune, help):
+    """Check that all bookmarks still point somewhere"""
+    if help:
+        click.echo(ctx.get_help())
+        ctx.exit()
+    problems = diagnose_bookmarks(timeout=timeout)
+    if not problems:
+        click.echo("All bookmarks are reachable")
+        return
+    for name, path, status in problems:
+        click.echo(f"{status}\t{name}\t{path}")
+    missing = [name for name, path, status in problems if status == "missing"]
+    if not missing:
+        return
+    if prune or (
+        sys.stdin.isatty()
+        and click.confirm(f"Remove {len(missing)} missing bookmark(s)?")
+    ):
+        prune_bookmarks(missing)
+        click.echo(f"Removed {len(missing)} bookmark(s)")
+
+
+@cli.command(options_metavar="<options>")
+@click.pass_context
+@click.argument(
+    "name",
+    required=False,
+    metavar="<name>",
+    type=click.STRING,
+)
+@click.option(
+    "-h", "--help", is_flag=True, default=False, help="Show this message and exit"
+)
+def path(ctx, name, help):
+    """Print the path of bookmark <name>"""
+    if help or name is None:
+        click.echo(ctx.get_help())
+        ctx.exit()
+    click.echo(bookmark_target(name))
+
+
+@cli.command(options_metavar="<options>")
+@click.pass_context
+@click.argument(
+    "shell",
+    required=False,
+    metavar="<shell>",
+    type=click.Choice(["bash", "zsh", "fish"]),
+)
+@click.option(
+    "-h", "--help", is_flag=True, default=False, help="Show this message and exit"
+)
+def init(ctx, shell, help):
+    """
+    Print shell functions for <shell> (bash, zsh or fish)
+
+    Add eval "$(bm init zsh)" to your shell's rc file (bm init fish | source
+    for fish). This wraps bm so that bm cd <name> changes directory in the
+    current shell, and changing directory from the dashboard no longer
+    starts a nested shell. Bookmark names are completed from a cache file,
+    without running bm.
+    """
+    if help or shell is None:
+        click.echo(ctx.get_help())
+        ctx.exit()
+    from bookmark.scripts.cache import lookup_path, names_path
+    from bookmark.scripts.frecency import visits_path
+    from bookmark.scripts.shell import init_script
+
+    click.echo(
+        init_script(shell, lookup_path(), names_path(), visits_path()), nl=False
+    )
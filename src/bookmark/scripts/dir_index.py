@@ -0,0 +1,116 @@
+import hashlib
+import json
+import os
+import threading
+import time
+from bookmark.scripts import cache, scanner
+
+
+# Directories modified this recently are rescanned next time even if their
+# mtime looks unchanged, since a second change within the same timestamp
+# tick would otherwise go unnoticed.
+RACY_NS = 2 * 10**9
+
+
+def index_path(root):
+    digest = hashlib.sha1(root.encode("utf-8", "surrogateescape")).hexdigest()
+    directory = os.path.join(cache.cache_dir(), "index")
+    os.makedirs(directory, exist_ok=True)
+    return os.path.join(directory, digest)
+
+
+def under(path, root):
+    return path == root or path.startswith(root.rstrip(os.sep) + os.sep)
+
+
+class DirIndex:
+    """Directory listings by path, shared by the trees of all bookmarks and
+    kept on disk between runs, one file per bookmark.
+
+    Each listing is stored with the directory's mtime and is reused as long
+    as the mtime is unchanged, so an unchanged directory costs one stat
+    instead of a scandir. A listing is ``trust``ed while a watcher is known
+    to report changes to its directory, and is then reused without a stat
+    until ``distrust`` is called. ``scan`` may be called from several
+    threads, and the lists it returns are shared with the index and must not
+    be changed.
+    """
+
+    def __init__(self):
+        self.entries = {}
+        self.loaded = set()
+        self.trusted = set()
+        self.version = 0
+        self.saved = {}
+        self.lock = threading.Lock()
+
+    def load(self, root, path=None):
+        if root in self.loaded:
+            return
+        self.loaded.add(root)
+        try:
+            with open(index_path(root) if path is None else path, "r") as f:
+                data = json.load(f)
+        except (OSError, ValueError):
+            return
+        if not isinstance(data, dict) or data.get("root") != root:
+            return
+        with self.lock:
+            # Listings already in memory are at least as recent.
+            for key, entry in data.get("entries", {}).items():
+                self.entries.setdefault(os.path.normpath(os.path.join(root, key)), entry)
+            self.saved[root] = self.version
+
+    def save(self, root, path=None):
+        with self.lock:
+            if self.saved.get(root) == self.version:
+                return
+            self.saved[root] = self.version
+            entries = {
+                os.path.relpath(other, root): entry
+                for other, entry in self.entries.items()
+                if under(other, root)
+            }
+            data = json.dumps({"root": root, "entries": entries}, separators=(",", ":"))
+        try:
+            cache.write_atomic(index_path(root) if path is None else path, data)
+        except (OSError, ValueError):
+            pass
+
+    def trust(self, path):
+        with self.lock:
+            if path in self.entries:
+                self.trusted.add(path)
+
+    def distrust(self, paths):
+        with self.lock:
+            self.trusted.difference_update(paths)
+
+    def forget(self, path, removed):
+        # Drop the listings under subdirectories that no longer exist.
+        removed = {os.path.join(path, name) for name in removed}
+        if not removed:
+            return
+        prefixes = tuple(name + os.sep for name in removed)
+        for other in list(self.entries):
+            if other in removed or other.startswith(prefixes):
+                del self.entries[other]
+                self.trusted.discard(other)
+
+    def scan(self, path):
+        with self.lock:
+            entry = self.entries.get(path)
+            if entry is not None and path in self.trusted:
+                return entry[1], entry[2]
+        mtime = os.stat(path).st_mtime_ns
+        if entry is not None and entry[0] == mtime:
+            return entry[1], entry[2]
+        dirs, files = scanner.scan(path, sort=False)
+        if time.time_ns() - mtime < RACY_NS:
+            mtime = None
+        with self.lock:
+            if entry is not None:
+                self.forget(path, set(entry[1]).difference(dirs))
+            self.entries[path] = [mtime, dirs, files]
+            self.version += 1
+        return dirs, files
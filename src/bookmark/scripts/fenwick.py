@@ -0,0 +1,56 @@
+class Fenwick:
+    """Prefix sums over a list of counts, with O(log n) updates and queries."""
+
+    __slots__ = ("values", "tree")
+
+    def __init__(self, values=()):
+        self.values = list(values)
+        n = len(self.values)
+        tree = [0] + self.values
+        # Each slot adds itself to the next slot that covers it, which
+        # builds the tree in O(n).
+        for i in range(1, n + 1):
+            j = i + (i & -i)
+            if j <= n:
+                tree[j] += tree[i]
+        self.tree = tree
+
+    def __len__(self):
+        return len(self.values)
+
+    def set(self, index, value):
+        delta = value - self.values[index]
+        if not delta:
+            return
+        self.values[index] = value
+        i = index + 1
+        n = len(self.values)
+        while i <= n:
+            self.tree[i] += delta
+            i += i & -i
+
+    def prefix(self, index):
+        """Return the sum of the first ``index`` values."""
+        total = 0
+        i = index
+        while i > 0:
+            total += self.tree[i]
+            i -= i & -i
+        return total
+
+    def find(self, position):
+        """Return the index of the value covering ``position``, counting
+        from 0 across all values."""
+        index = 0
+        step = 1 << (len(self.values).bit_length() - 1) if self.values else 0
+        while step:
+            i = index + step
+            if i <= len(self.values) and self.tree[i] <= position:
+                index = i
+                position -= self.tree[i]
+            step >>= 1
+        return index
+
+    @property
+    def total(self):
+        return self.prefix(len(self.values))
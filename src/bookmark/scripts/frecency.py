@@ -0,0 +1,211 @@
+import atexit
+import fcntl
+import glob
+import os
+import time
+from bookmark.scripts import cache
+
+
+# Same weighting as z/zoxide: recent visits count for more.
+HOUR = 3600
+DAY = 24 * HOUR
+WEEK = 7 * DAY
+
+MAX_ENTRIES = 2000
+MAX_TOTAL = 10000
+BATCH = 32
+# Logs set aside by a flush are kept this long after their last change,
+# for a shell that opened the log just before it was moved.
+GRACE = 60
+
+
+def store_path():
+    return os.path.join(cache.cache_dir(), "frecency")
+
+
+def visits_path():
+    return os.path.join(cache.cache_dir(), "visits")
+
+
+class Frecency:
+    """Visit counts per path, scored by frequency decayed by recency.
+
+    Visits are buffered in memory and also accepted from an append-only log
+    (written by the shell functions), and are folded into the compact
+    ``path<TAB>count<TAB>last`` table on ``flush``. Once the counts add up to
+    more than ``MAX_TOTAL`` they are all aged, and the table never keeps more
+    than ``MAX_ENTRIES`` paths.
+    """
+
+    def __init__(self, path=None, log_path=None):
+        self.path = store_path() if path is None else path
+        self.log_path = visits_path() if log_path is None else log_path
+        self.entries = {}
+        self.pending = []
+        self.logged = 0
+        self.load()
+
+    def load(self, logs=None):
+        self.entries = {}
+        try:
+            with open(self.path, "r") as f:
+                for line in f:
+                    try:
+                        path, count, last = line.rstrip("\n").split("\t")
+                        self.entries[path] = [float(count), float(last)]
+                    except ValueError:
+                        continue
+        except FileNotFoundError:
+            pass
+        visits = []
+        self.read = {}
+        for log, start in ({self.log_path: 0} if logs is None else logs).items():
+            log_visits, self.read[log] = self._read_log(log, start)
+            visits += log_visits
+        self.logged = len(visits)
+        self._apply(visits)
+
+    def _read_log(self, log, start=0):
+        """Return the visits in ``log`` after byte ``start``, and the offset
+        of the end of the last one."""
+        try:
+            with open(log, "rb") as f:
+                f.seek(start)
+                data = f.read()
+        except FileNotFoundError:
+            return [], start
+        # A line without its newline is still being written.
+        end = data.rfind(b"\n") + 1
+        visits = []
+        for line in data[:end].decode("utf-8", "surrogateescape").splitlines():
+            try:
+                path, when = line.split("\t")
+                visits.append((path, float(when)))
+            except ValueError:
+                continue
+        return visits, start + end
+
+    def _apply(self, visits):
+        for path, when in visits:
+            entry = self.entries.setdefault(path, [0.0, when])
+            entry[0] += 1
+            entry[1] = max(entry[1], when)
+
+    def visit(self, path, when=None):
+        path = os.path.abspath(path)
+        when = time.time() if when is None else when
+        self.pending.append((path, when))
+        self._apply([(path, when)])
+        if len(self.pending) >= BATCH:
+            self.flush()
+
+    def score(self, path, now=None):
+        entry = self.entries.get(path)
+        if entry is None:
+            return 0.0
+        count, last = entry
+        age = (time.time() if now is None else now) - last
+        if age < HOUR:
+            return count * 4
+        elif age < DAY:
+            return count * 2
+        elif age < WEEK:
+            return count / 2
+        return count / 4
+
+    def age(self):
+        if sum(count for count, last in self.entries.values()) <= MAX_TOTAL:
+            return
+        for path in list(self.entries):
+            self.entries[path][0] *= 0.9
+            if self.entries[path][0] < 1:
+                del self.entries[path]
+
+    def flush(self):
+        pending, self.pending = self.pending, []
+        with open(self.path + ".lock", "a") as lock:
+            fcntl.flock(lock, fcntl.LOCK_EX)
+            # Start again from disk so visits flushed by other processes and
+            # the shell's log are kept. The log is moved aside first, so the
+            # shell appends to a new one instead of to a log being emptied.
+            logs = self._set_aside()
+            self.load(logs)
+            self._apply(pending)
+            self.age()
+            if len(self.entries) > MAX_ENTRIES:
+                now = time.time()
+                keep = sorted(
+                    self.entries, key=lambda p: self.score(p, now), reverse=True
+                )[:MAX_ENTRIES]
+                self.entries = {path: self.entries[path] for path in keep}
+            cache.write_atomic(
+                self.path,
+                "".join(
+                    f"{path}\t{count:g}\t{last:.0f}\n"
+                    for path, (count, last) in self.entries.items()
+                ),
+            )
+            self._retire(logs)
+            self.logged = 0
+
+    def _set_aside(self):
+        """Move the log aside, and return the logs to fold in with the
+        offset each was read up to."""
+        # Set aside logs are named log.N.OFFSET, and are read again from
+        # OFFSET by each flush until they are retired.
+        prefix = self.log_path + "."
+        logs = {}
+        for log in glob.glob(glob.escape(prefix) + "[0-9]*.[0-9]*"):
+            number, _, offset = log[len(prefix) :].partition(".")
+            if number.isdigit() and offset.isdigit():
+                logs[log] = int(offset)
+        number = 1 + max(
+            (int(log[len(prefix) :].partition(".")[0]) for log in logs), default=0
+        )
+        aside = f"{prefix}{number}.0"
+        try:
+            os.replace(self.log_path, aside)
+        except FileNotFoundError:
+            pass
+        else:
+            logs[aside] = 0
+        return logs
+
+    def _retire(self, logs):
+        # A shell that opened the log just before it was moved aside may
+        # still append to it, so a log is only removed once it has not
+        # changed for GRACE seconds. Until then its name keeps how far it
+        # was read.
+        now = time.time()
+        for log, start in logs.items():
+            end = self.read[log]
+            try:
+                st = os.stat(log)
+                if st.st_size == end and now - st.st_ctime > GRACE:
+                    os.unlink(log)
+                elif end != start:
+                    os.replace(log, f"{log.rsplit('.', 1)[0]}.{end}")
+            except FileNotFoundError:
+                pass
+
+
+_frecency = None
+
+
+def get():
+    global _frecency
+    if _frecency is None:
+        _frecency = Frecency()
+        atexit.register(
+            lambda frecency=_frecency: (frecency.pending or frecency.logged)
+            and frecency.flush()
+        )
+    return _frecency
+
+
+def visit(path):
+    get().visit(path)
+
+
+def score(path, now=None):
+    return get().score(os.path.abspath(path), now)
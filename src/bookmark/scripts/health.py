@@ -0,0 +1,120 @@
+import os
+import stat
+import threading
+import time
+from queue import Empty, Queue
+from bookmark.scripts import cache
+
+
+TTL = 300
+FORGET = 24 * 3600
+TIMEOUT = 1.0
+WORKERS = 32
+
+DIR = "dir"
+FILE = "file"
+MISSING = "missing"
+SLOW = "slow"
+
+
+def health_path():
+    return os.path.join(cache.cache_dir(), "health")
+
+
+def classify(path):
+    try:
+        mode = os.stat(path).st_mode
+    except OSError:
+        return MISSING
+    return DIR if stat.S_ISDIR(mode) else FILE
+
+
+def stat_all(paths, timeout=TIMEOUT):
+    # Plain daemon threads rather than a ThreadPoolExecutor: a stat stuck on
+    # a dead mount must not keep the process from exiting.
+    results = {}
+    queue = Queue()
+    for path in paths:
+        queue.put(path)
+
+    def worker():
+        while True:
+            try:
+                path = queue.get_nowait()
+            except Empty:
+                return
+            results[path] = classify(path)
+
+    threads = [
+        threading.Thread(target=worker, daemon=True)
+        for _ in range(min(WORKERS, len(paths)))
+    ]
+    for thread in threads:
+        thread.start()
+    deadline = time.monotonic() + timeout
+    for thread in threads:
+        thread.join(max(0, deadline - time.monotonic()))
+    return {path: results.get(path, SLOW) for path in paths}
+
+
+def load_cache():
+    entries = {}
+    try:
+        with open(health_path(), "r") as f:
+            for line in f:
+                try:
+                    path, status, checked = line.rstrip("\n").split("\t")
+                    entries[path] = (status, float(checked))
+                except ValueError:
+                    continue
+    except FileNotFoundError:
+        pass
+    return entries
+
+
+def write_cache(entries, now):
+    try:
+        cache.write_atomic(
+            health_path(),
+            "".join(
+                f"{path}\t{status}\t{checked:.0f}\n"
+                for path, (status, checked) in entries.items()
+                if now - checked < FORGET and "\t" not in path and "\n" not in path
+            ),
+        )
+    except OSError:
+        pass
+
+
+def forget(paths):
+    """Drop the cached results of ``paths``, which are checked again next
+    time."""
+    entries = load_cache()
+    dropped = [path for path in paths if entries.pop(path, None) is not None]
+    if dropped:
+        write_cache(entries, time.time())
+
+
+def check(paths, timeout=TIMEOUT, ttl=TTL):
+    """Classify each path as dir, file, missing or slow.
+
+    Results younger than ``ttl`` seconds are taken from the cache, and the
+    rest are stat'ed concurrently with at most ``timeout`` seconds to wait.
+    Slow results are never reused from the cache.
+    """
+    now = time.time()
+    entries = load_cache()
+    results = {}
+    stale = []
+    for path in paths:
+        status, checked = entries.get(path, (None, 0))
+        if status not in (None, SLOW) and now - checked < ttl:
+            results[path] = status
+        else:
+            stale.append(path)
+    if stale:
+        fresh = stat_all(stale, timeout=timeout)
+        results.update(fresh)
+        entries.update((path, (status, now)) for path, status in fresh.items())
+        write_cache(entries, now)
+    return results
@@ -0,0 +1,284 @@
+import os
+import re
+
+
+GLOB_CHARS = re.compile(r"[*?\[]")
+IGNORE_FILES = (".gitignore", ".ignore")
+
+
+def ignore_files():
+    return IGNORE_FILES if os.getenv("BOOKMARK_GITIGNORE") else ()
+
+
+def escape(name):
+    """Return a pattern matching exactly the file name ``name``."""
+    pattern = re.sub(r"([*?\[\\])", r"\\\1", name)
+    if pattern.startswith(("!", "#")):
+        pattern = "\\" + pattern
+    return pattern
+
+
+def translate(pattern):
+    """Translate a .gitignore glob into a regular expression.
+
+    ``*`` and ``?`` do not match ``/``, while ``**/``, ``/**/`` and a
+    trailing ``/**`` match any number of directories.
+    """
+    parts = []
+    i = 0
+    n = len(pattern)
+    while i < n:
+        c = pattern[i]
+        if pattern.startswith("**/", i):
+            parts.append("(?:.*/)?")
+            i += 3
+            continue
+        if pattern.startswith("**", i) and i + 2 == n:
+            parts.append(".*")
+            i += 2
+            continue
+        if c == "*":
+            parts.append("[^/]*")
+        elif c == "?":
+            parts.append("[^/]")
+        elif c == "[":
+            end = pattern.find("]", i + 2 if pattern.startswith("[!", i) else i + 1)
+            if end < 0:
+                parts.append(re.escape(c))
+            else:
+                body = pattern[i + 1 : end]
+                if body.startswith("!"):
+                    body = "^" + body[1:]
+                parts.append(f"[{body.replace(chr(92), chr(92) * 2)}]")
+                i = end
+        elif c == "\\" and i + 1 < n:
+            i += 1
+            parts.append(re.escape(pattern[i]))
+        else:
+            parts.append(re.escape(c))
+        i += 1
+    return "".join(parts)
+
+
+class RuleSet:
+    """Patterns from one source, relative to the directory ``base``.
+
+    Patterns without negations are merged into one set of exact names and
+    two regular expressions, so matching does not depend on the number of
+    patterns.
+    """
+
+    __slots__ = (
+        "patterns",
+        "base",
+        "rules",
+        "names",
+        "name_re",
+        "path_re",
+        "name_src",
+        "simple",
+    )
+
+    def __init__(self, patterns, base=""):
+        self.patterns = tuple(patterns)
+        self.base = base
+        rules = []
+        for pattern in self.patterns:
+            rule = self.parse(pattern)
+            if rule is not None:
+                rules.append(rule)
+        if any(negate for negate, dir_only, kind, value in rules):
+            # Order matters once a pattern can re-include an entry.
+            self.rules = [
+                (negate, dir_only, kind, re.compile(f"(?:{value})\\Z"))
+                if kind != "name"
+                else (negate, dir_only, kind, value)
+                for negate, dir_only, kind, value in rules
+            ]
+            self.names = self.name_re = self.path_re = self.name_src = None
+            self.simple = False
+            return
+        self.rules = None
+        # Indexed by dir_only, so directory-only patterns are only tried on
+        # directories.
+        self.names = (set(), set())
+        name_globs = ([], [])
+        path_globs = ([], [])
+        for negate, dir_only, kind, value in rules:
+            if kind == "name":
+                self.names[dir_only].add(value)
+            elif kind == "name_glob":
+                name_globs[dir_only].append(value)
+            else:
+                path_globs[dir_only].append(value)
+        self.name_re = tuple(self.join(globs) for globs in name_globs)
+        self.path_re = tuple(self.join(globs) for globs in path_globs)
+        self.name_src = tuple("|".join(globs) for globs in name_globs)
+        # Only names are matched, so the rules can be merged with others.
+        self.simple = not path_globs[0] and not path_globs[1]
+
+    @staticmethod
+    def join(globs):
+        if not globs:
+            return None
+        return re.compile("(?:" + "|".join(globs) + ")\\Z")
+
+    @staticmethod
+    def parse(pattern):
+        pattern = pattern.rstrip("\n")
+        if pattern.endswith("\\ "):
+            pattern = pattern[:-2].rstrip(" ") + "\\ "
+        else:
+            pattern = pattern.rstrip(" ")
+        if not pattern or pattern.startswith("#"):
+            return None
+        negate = pattern.startswith("!")
+        if negate:
+            pattern = pattern[1:]
+        elif pattern.startswith("\\!") or pattern.startswith("\\#"):
+            pattern = pattern[1:]
+        dir_only = pattern.endswith("/")
+        pattern = pattern.rstrip("/")
+        if not pattern:
+            return None
+        if "/" in pattern:
+            return negate, dir_only, "path", translate(pattern.lstrip("/"))
+        if GLOB_CHARS.search(pattern) or "\\" in pattern:
+            return negate, dir_only, "name_glob", translate(pattern)
+        return negate, dir_only, "name", pattern
+
+    def match(self, name, path, is_dir):
+        """Return True to ignore, False to keep, or None for no match."""
+        if self.rules is None:
+            if name in self.names[0] or (is_dir and name in self.names[1]):
+                return True
+            for dir_only in (False, True) if is_dir else (False,):
+                name_re = self.name_re[dir_only]
+                if name_re is not None and name_re.match(name):
+                    return True
+                path_re = self.path_re[dir_only]
+                if path_re is not None and path_re.match(path):
+                    return True
+            return None
+        for negate, dir_only, kind, value in reversed(self.rules):
+            if dir_only and not is_dir:
+                continue
+            if kind == "name":
+                matched = name == value
+            elif kind == "name_glob":
+                matched = value.match(name) is not None
+            else:
+                matched = value.match(path) is not None
+            if matched:
+                return not negate
+        return None
+
+
+class Ignores:
+    """The ignore rules in effect for one directory of a tree.
+
+    Patterns follow .gitignore: a pattern without a slash matches a name at
+    any depth, a leading or inner slash anchors it to the directory it was
+    given for, a trailing slash matches only directories, ``!`` includes an
+    entry again, and ``*``, ``?``, ``[...]`` and ``**`` are globs. Rules
+    given for deeper directories take precedence. Plain names, which is all
+    the old ignore lists held, behave exactly as before.
+
+    When ``files`` names ignore files, such as ``.gitignore``, the ones
+    found while listing a directory add to its rules and its
+    subdirectories'. ``inherited`` is the directory's rules without them.
+    """
+
+    __slots__ = ("rel", "rulesets", "files", "inherited")
+
+    def __init__(self, patterns=(), files=()):
+        self.rel = ""
+        self.rulesets = (RuleSet(patterns),) if patterns else ()
+        self.files = tuple(files)
+        self.inherited = self
+
+    def _derive(self, rel, rulesets, inherited=None):
+        ignores = Ignores.__new__(Ignores)
+        ignores.rel = rel
+        ignores.rulesets = rulesets
+        ignores.files = self.files
+        ignores.inherited = ignores if inherited is None else inherited
+        return ignores
+
+    def child(self, name):
+        return self._derive(f"{self.rel}/{name}" if self.rel else name, self.rulesets)
+
+    def read(self, path, files):
+        """Return the rules for ``path`` given the names listed in it."""
+        inherited = self.inherited
+        patterns = []
+        for name in self.files:
+            if name not in files:
+                continue
+            try:
+                with open(os.path.join(path, name), "r", errors="replace") as f:
+                    patterns.extend(f.read().splitlines())
+            except OSError:
+                continue
+        if not patterns:
+            return inherited
+        if self is not inherited and self.rulesets[-1].patterns == tuple(patterns):
+            return self
+        rulesets = inherited.rulesets + (RuleSet(patterns, inherited.rel),)
+        return self._derive(inherited.rel, rulesets, inherited)
+
+    def reroot(self, patterns):
+        """Return root rules for ``patterns``, keeping those read from files."""
+        ignores = Ignores(patterns, self.files)
+        if self.inherited is self:
+            return ignores
+        rulesets = ignores.rulesets + self.rulesets[-1:]
+        return self._derive("", rulesets, ignores)
+
+    def rebase(self, parent, name):
+        """Return these rules with ``parent``'s in place of the inherited."""
+        ignores = parent.child(name)
+        if self.inherited is self:
+            return ignores
+        rulesets = ignores.rulesets + self.rulesets[-1:]
+        return self._derive(ignores.rel, rulesets, ignores)
+
+    def ignored(self, name, is_dir):
+        path = f"{self.rel}/{name}" if self.rel else name
+        for ruleset in reversed(self.rulesets):
+            relative = path[len(ruleset.base) + 1 :] if ruleset.base else path
+            result = ruleset.match(name, relative, is_dir)
+            if result is not None:
+                return result
+        return False
+
+    def filter(self, dirs, files):
+        if not self.rulesets:
+            return dirs, files
+        if all(ruleset.simple for ruleset in self.rulesets):
+            return (
+                self._filter_names(dirs, True),
+                self._filter_names(files, False),
+            )
+        return (
+            [dir for dir in dirs if not self.ignored(dir, True)],
+            [file for file in files if not self.ignored(file, False)],
+        )
+
+    def _filter_names(self, names, is_dir):
+        # Without negations or paths, a name is ignored if any rule matches
+        # it, so all rules become one set and one regular expression.
+        exact = set()
+        sources = []
+        for ruleset in self.rulesets:
+            exact.update(ruleset.names[0])
+            if ruleset.name_src[0]:
+                sources.append(ruleset.name_src[0])
+            if is_dir:
+                exact.update(ruleset.names[1])
+                if ruleset.name_src[1]:
+                    sources.append(ruleset.name_src[1])
+        if not sources:
+            return [name for name in names if name not in exact]
+        match = re.compile("(?:" + "|".join(sources) + ")\\Z").match
+        return [name for name in names if name not in exact and not match(name)]
@@ -0,0 +1,60 @@
+import os
+from bookmark.scripts import store as _store
+
+
+_state = {"store": None, "stamp": None, "data": None}
+
+
+def get_store():
+    if _state["store"] is None:
+        store = _store.get_store()
+        store.listeners.append(_changed)
+        _state["store"] = store
+    return _state["store"]
+
+
+def _changed(store, added, removed):
+    from bookmark.scripts import cache, health
+
+    invalidate()
+    if added:
+        # A bookmark added again may point to a path that was missing.
+        health.forget([path for name, path in added])
+    if added is None and removed is None:
+        cache.write_lookup()
+    else:
+        cache.update_lookup(added or (), removed or ())
+
+
+def stamp(store=None):
+    store = get_store() if store is None else store
+    result = []
+    for path in store.files():
+        try:
+            st = os.stat(path)
+        except FileNotFoundError:
+            result.append((path, None))
+        else:
+            result.append((path, st.st_mtime_ns, st.st_ino, st.st_size))
+    return tuple(result)
+
+
+def load():
+    """Return the cached ``(bookmarks, ignores)`` pair, parsing only on change.
+
+    The returned dicts are shared between callers and must not be mutated.
+    """
+    current = stamp()
+    if _state["data"] is None or current != _state["stamp"]:
+        _state["data"] = get_store().load()
+        _state["stamp"] = current
+    return _state["data"]
+
+
+def changed(since):
+    return stamp() != since
+
+
+def invalidate():
+    _state["stamp"] = None
+    _state["data"] = None
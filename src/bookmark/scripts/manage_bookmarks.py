@@ -1,57 +1,61 @@
-import rich_click as click
+import click
 import json
 import os
-from rich import box
-from rich.table import Table
-from rich.text import Text
+import sys
+from bookmark.scripts import cache, health, loader
+
+
+INVALID_FILE = "Invalid .bookmarks file. Run bm -r to reset the file."
+
+
+def load_store():
+    try:
+        return loader.get_store()
+    except ValueError as e:
+        raise click.ClickException(str(e))
+
+
+def load_bookmarks():
+    load_store()
+    try:
+        return loader.load()
+    except ValueError:
+        raise click.ClickException(INVALID_FILE)
 
 
 def add_bookmark(name, path):
-    if os.getenv("BOOKMARK_PATH") is not None:
-        bookmark_path = os.getenv("BOOKMARK_PATH")
-    else:
-        bookmark_path = os.getenv("HOME") + "/.bookmarks"
-    with open(bookmark_path, "r") as f:
-        json_dict = json.load(f)
-    bookmarks = json_dict["bookmarks"]
-    bookmarks[name] = path
-    with open(bookmark_path, "w") as f:
-        json_dict["bookmarks"] = bookmarks
-        json.dump(json_dict, f, indent=4, separators=(",", ": "), sort_keys=True)
+    try:
+        load_store().add(name, path)
+    except ValueError:
+        raise click.ClickException(INVALID_FILE)
 
 
 def del_bookmark(name):
-    if os.getenv("BOOKMARK_PATH") is not None:
-        bookmark_path = os.getenv("BOOKMARK_PATH")
-    else:
-        bookmark_path = os.getenv("HOME") + "/.bookmarks"
-    with open(bookmark_path, "r") as f:
-        json_dict = json.load(f)
-        bookmarks = json_dict["bookmarks"]
     try:
-        bookmarks.pop(name)
+        load_store().remove(name)
     except KeyError:
         raise click.ClickException("Bookmark is not in bookmark list")
-    with open(bookmark_path, "w") as f:
-        json_dict["bookmarks"] = bookmarks
-        json.dump(json_dict, f, indent=4, separators=(",", ": "), sort_keys=True)
+    except ValueError:
+        raise click.ClickException(INVALID_FILE)
 
 
 def list_bookmarks():
-    if os.getenv("BOOKMARK_PATH") is not None:
-        bookmark_path = os.getenv("BOOKMARK_PATH")
-    else:
-        bookmark_path = os.getenv("HOME") + "/.bookmarks"
-    with open(bookmark_path, "r") as f:
-        json_dict = json.load(f)
-        bookmarks = json_dict["bookmarks"]
+    from rich import box
+    from rich.table import Table
+    from rich.text import Text
+
+    bookmarks, ignores = load_bookmarks()
+    status = health.check(list(bookmarks.values()))
     dir_bookmarks = []
     file_bookmarks = []
+    broken_bookmarks = []
     for name, path in bookmarks.items():
-        if os.path.isdir(path):
+        if status[path] == health.DIR:
             dir_bookmarks.append((name, path))
-        else:
+        elif status[path] == health.FILE:
             file_bookmarks.append((name, path))
+        else:
+            broken_bookmarks.append((name, path))
     table = Table(title="Bookmarks", box=box.HEAVY_HEAD, show_lines=True)
     table.add_column("Bookmark name", style="cyan", no_wrap=True)
     table.add_column("Path", style="magenta", no_wrap=True)
@@ -59,62 +63,162 @@ def list_bookmarks():
         table.add_row(Text.from_markup(f":open_file_folder: {name}"), path)
     for name, path in sorted(file_bookmarks):
         table.add_row(Text.from_markup(f":page_facing_up: {name}"), path)
+    for name, path in sorted(broken_bookmarks):
+        table.add_row(
+            Text.from_markup(f":warning: {name}"),
+            Text(f"{path} ({status[path]})", style="red"),
+        )
     return table
 
 
-def ignore_element(bookmark, element):
-    if os.getenv("BOOKMARK_PATH") is not None:
-        bookmark_path = os.getenv("BOOKMARK_PATH")
-    else:
-        bookmark_path = os.getenv("HOME") + "/.bookmarks"
-    with open(bookmark_path, "r") as f:
-        json_dict = json.load(f)
-        ignores = json_dict["ignores"]
+def bookmark_target(name):
     try:
-        if bookmark in ignores:
-            ignores[bookmark].append(element)
+        path = cache.resolve(name)
+    except ValueError:
+        raise click.ClickException(INVALID_FILE)
+    if path is None:
+        raise click.ClickException("Bookmark is not in bookmark list")
+    return path
+
+
+def iter_bookmarks(classify=True):
+    bookmarks, ignores = load_bookmarks()
+    status = health.check(list(bookmarks.values())) if classify else {}
+    for name in sorted(bookmarks):
+        path = bookmarks[name]
+        yield name, path, status.get(path)
+
+
+def write_bookmarks(fmt, classify=True, file=None):
+    file = sys.stdout if file is None else file
+    rows = iter_bookmarks(classify=classify and fmt != "names")
+    if fmt == "names":
+        for name, path, type in rows:
+            file.write(f"{name}\n")
+    elif fmt == "tsv":
+        for name, path, type in rows:
+            if type is None:
+                file.write(f"{name}\t{path}\n")
+            else:
+                file.write(f"{name}\t{path}\t{type}\n")
+    elif fmt in ("json", "ndjson"):
+        separator = "[" if fmt == "json" else ""
+        for name, path, type in rows:
+            row = {"name": name, "path": path}
+            if type is not None:
+                row["type"] = type
+            file.write(separator + json.dumps(row))
+            separator = "," if fmt == "json" else "\n"
+        if fmt == "json":
+            file.write("]\n" if separator == "," else "[]\n")
+        elif separator:
+            file.write("\n")
+    else:
+        raise click.ClickException(f"Unknown list format {fmt!r}")
+
+
+def parse_bookmarks(file, fmt):
+    if fmt == "tsv":
+        for line in file:
+            fields = line.rstrip("\n").split("\t")
+            if len(fields) < 2:
+                continue
+            yield fields[0], fields[1]
+    elif fmt == "ndjson":
+        for line in file:
+            if line.strip():
+                row = json.loads(line)
+                yield row["name"], row["path"]
+    elif fmt == "json":
+        data = json.load(file)
+        # Accept bm list --format json output, a {name: path} object, or a
+        # whole .bookmarks file.
+        if isinstance(data, dict):
+            yield from data.get("bookmarks", data).items()
         else:
-            ignores[bookmark] = [element]
-    except KeyError:
-        raise click.ClickException("Invalid bookmark provided")
-    with open(bookmark_path, "w") as f:
-        json_dict["ignores"] = ignores
-        json.dump(json_dict, f, indent=4, separators=(",", ": "), sort_keys=True)
+            for row in data:
+                yield row["name"], row["path"]
+    elif fmt == "cdpath":
+        for line in file:
+            for path in line.strip().split(":"):
+                if path:
+                    path = path.rstrip("/") or "/"
+                    yield os.path.basename(path) or path, path
+    else:
+        raise click.ClickException(f"Unknown import format {fmt!r}")
+
+
+def merge_bookmarks(existing, entries, policy):
+    merged = {}
+    taken = set(existing)
+    for name, path in entries:
+        if name in taken:
+            if policy == "skip":
+                continue
+            elif policy == "rename":
+                suffix = 2
+                while f"{name}-{suffix}" in taken:
+                    suffix += 1
+                name = f"{name}-{suffix}"
+        merged[name] = path
+        taken.add(name)
+    return merged
+
+
+def import_bookmarks(file, fmt="tsv", policy="skip", validate=True):
+    existing, ignores = load_bookmarks()
+    try:
+        entries = [
+            (name, os.path.abspath(os.path.expanduser(path)))
+            for name, path in parse_bookmarks(file, fmt)
+        ]
+    except (ValueError, KeyError, TypeError, AttributeError):
+        raise click.ClickException(f"Could not parse input as {fmt}")
+    invalid = []
+    if validate:
+        status = health.stat_all(list({path for name, path in entries}))
+        invalid = [(n, p) for n, p in entries if status[p] == health.MISSING]
+        entries = [(n, p) for n, p in entries if status[p] != health.MISSING]
+    merged = merge_bookmarks(existing, entries, policy)
+    try:
+        load_store().add_many(list(merged.items()))
+    except ValueError:
+        raise click.ClickException(INVALID_FILE)
+    return merged, invalid
+
+
+def diagnose_bookmarks(timeout=health.TIMEOUT):
+    bookmarks, ignores = load_bookmarks()
+    status = health.check(list(bookmarks.values()), timeout=timeout, ttl=0)
+    return [
+        (name, path, status[path])
+        for name, path in sorted(bookmarks.items())
+        if status[path] in (health.MISSING, health.SLOW)
+    ]
+
+
+def prune_bookmarks(names):
+    try:
+        load_store().remove_many(names)
+    except KeyError as e:
+        raise click.ClickException(f"Bookmark {e.args[0]} is not in bookmark list")
+    except ValueError:
+        raise click.ClickException(INVALID_FILE)
+
+
+def ignore_element(bookmark, element):
+    try:
+        load_store().ignore(bookmark, element)
+    except ValueError:
+        raise click.ClickException(INVALID_FILE)
 
 
 def check_file():
-    if os.getenv("BOOKMARK_PATH") is not None:
-        bookmark_path = os.getenv("BOOKMARK_PATH")
-    else:
-        bookmark_path = os.getenv("HOME") + "/.bookmarks"
-    with open(bookmark_path, "r") as f:
-        try:
-            json_dict = json.load(f)
-            try:
-                bookmarks = json_dict["bookmarks"]
-                ignores = json_dict["ignores"]
-                for bookmark, path in bookmarks.items():
-                    if not (isinstance(bookmark, str) and isinstance(path, str)):
-                        raise click.ClickException("Invalid .bookmarks file. Run bm -r to reset the file.")
-                for bookmark, ignore_list in ignores.items():
-                    if not (isinstance(bookmark, str) and isinstance(ignore_list, list)):
-                        raise click.ClickException("Invalid .bookmarks file. Run bm -r to reset the file.")
-                    if not all(filter(lambda x: isinstance(x, str), ignore_list)):
-                        raise click.ClickException("Invalid .bookmarks file. Run bm -r to reset the file.")
-                if not bookmarks:
-                    return "empty"
-            except KeyError:
-                raise click.ClickException("Invalid .bookmarks file. Run bm -r to reset the file.")
-        except json.JSONDecodeError:
-            raise click.ClickException("Invalid .bookmarks file. Run bm -r to reset the file.")
+    bookmarks, ignores = load_bookmarks()
+    if not bookmarks:
+        return "empty"
     return "ok"
 
 
 def reset_file():
-    if os.getenv("BOOKMARK_PATH") is not None:
-        bookmark_path = os.getenv("BOOKMARK_PATH")
-    else:
-        bookmark_path = os.getenv("HOME") + "/.bookmarks"
-    blank_dict = {"bookmarks": {}, "ignores": {"global": []}}
-    with open(bookmark_path, "w") as f:
-        json.dump(blank_dict, f)
+    load_store().reset()
@@ -0,0 +1,98 @@
+import os
+from array import array
+
+
+DIR = 1
+# A directory that was not listed, see bookmark_dir_tree.mark_node.
+MARKED = 2
+
+
+class NodeStore:
+    """Directory entries kept column-wise instead of as one object each.
+
+    Entry ``i`` has a parent, flags and a name. Names are kept encoded in a
+    single buffer, so an entry costs about 13 bytes plus the length of its
+    name. A parent ``p >= 0`` is another entry, and a parent ``p < 0`` is
+    the directory ``bases[-1 - p]``, which is how entries hang off the
+    nodes of a tree that are already built.
+    """
+
+    def __init__(self):
+        self.bases = []
+        self.parents = array("i")
+        self.flags = bytearray()
+        self.offsets = array("q", [0])
+        self.names = bytearray()
+
+    def __len__(self):
+        return len(self.parents)
+
+    def add_base(self, path):
+        self.bases.append(path)
+        return -len(self.bases)
+
+    def add(self, parent, name, flags=0):
+        self.parents.append(parent)
+        self.flags.append(flags)
+        self.names += os.fsencode(name)
+        self.offsets.append(len(self.names))
+        return len(self.parents) - 1
+
+    def add_listing(self, parent, dirs, files):
+        """Add the entries of one directory and return the index of the first."""
+        first = len(self.parents)
+        for dir in dirs:
+            self.add(parent, dir, DIR)
+        for file in files:
+            self.add(parent, file)
+        return first
+
+    def name(self, index):
+        start = self.offsets[index]
+        return os.fsdecode(bytes(self.names[start : self.offsets[index + 1]]))
+
+    def is_dir(self, index):
+        return bool(self.flags[index] & DIR)
+
+    def is_marked(self, index):
+        return bool(self.flags[index] & MARKED)
+
+    def path(self, index):
+        parts = []
+        while index >= 0:
+            parts.append(self.name(index))
+            index = self.parents[index]
+        parts.append(self.bases[-1 - index])
+        return "/".join(reversed(parts))
+
+    def entries(self):
+        """Yield a view of each entry, made only when it is reached."""
+        for index in range(len(self.parents)):
+            yield Entry(self, index)
+
+
+class Entry:
+    """A view of one entry of a NodeStore, with the label and path a tree
+    node would have."""
+
+    __slots__ = ("store", "index")
+
+    def __init__(self, store, index):
+        self.store = store
+        self.index = index
+
+    @property
+    def label(self):
+        return self.store.name(self.index)
+
+    @property
+    def path(self):
+        return self.store.path(self.index)
+
+    @property
+    def type(self):
+        return "dir" if self.store.is_dir(self.index) else "file"
+
+    @property
+    def marked(self):
+        return self.store.is_marked(self.index)
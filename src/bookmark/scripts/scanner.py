@@ -0,0 +1,29 @@
+import os
+
+
+def scan(path, sort=True):
+    """Return the directory and file names in ``path``, sorted unless
+    ``sort`` is false.
+
+    Uses the type information from ``os.scandir`` instead of a stat per
+    entry. Like ``os.path.isdir``, symlinks to directories count as
+    directories. Raises ``PermissionError`` if ``path`` cannot be listed.
+    Nothing is left out, ignores are applied by ``Ignores.filter``.
+    """
+    dirs = []
+    files = []
+    with os.scandir(path) as entries:
+        for entry in entries:
+            name = entry.name
+            try:
+                is_dir = entry.is_dir()
+            except OSError:
+                is_dir = False
+            if is_dir:
+                dirs.append(name)
+            else:
+                files.append(name)
+    if sort:
+        dirs.sort()
+        files.sort()
+    return dirs, files
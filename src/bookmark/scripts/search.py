@@ -23,6 +23,8 @@ import os
 import regex as re
 import rich_click as click
 import tempfile
+import time
+from bookmark.scripts import frecency
 from collections import Counter
 from rich.text import Text
 from thefuzz import process
@@ -90,12 +92,15 @@ from thefuzz import process
 #     return [label_map[label] for label in node_labels]
 
 
-def search_thefuzz(pattern, nodes):
-    label_map = {node.label: node for node in nodes}
-    node_labels = [
-        tup[0] for tup in process.extract(pattern, list(label_map.keys()), limit=500)
-    ]
-    return [label_map[label] for label in node_labels]
+def search_thefuzz(pattern, label_map):
+    matches = process.extract(pattern, list(label_map.keys()), limit=500)
+    # Equal fuzzy scores are ordered by how often and recently a path was used.
+    now = time.time()
+    matches.sort(
+        key=lambda tup: (tup[1], frecency.score(label_map[tup[0]].path, now)),
+        reverse=True,
+    )
+    return [label_map[tup[0]] for tup in matches]
 
 
 def search_fzf(choices=None, fzf_options="", delimiter="\n", fzf_path="fzf"):
@@ -129,5 +134,5 @@ def search(pattern, nodes, fzf_path=""):
         node_labels = search_fzf(list(label_map.keys()), fzf_options=f"-f {pattern}", fzf_path=fzf_path)
         result = [label_map[label] for label in node_labels]
     else:
-        result = search_thefuzz(pattern, nodes)
+        result = search_thefuzz(pattern, label_map)
     return result
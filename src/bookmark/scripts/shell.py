@@ -0,0 +1,114 @@
+import shlex
+
+
+POSIX = """\
+bm() {
+    if [ "$1" = "cd" ]; then
+        local target
+        target="$(awk -F '\\t' -v name="$2" '$1 == name { print $2; exit }' \\
+            %(lookup)s 2>/dev/null)"
+        if [ -z "$target" ]; then
+            target="$(command bm path "$2")" || return 1
+        fi
+        [ -d "$target" ] || target="$(dirname "$target")"
+        cd "$target" && printf '%%s\t%%s\n' "$PWD" "$(date +%%s)" >> %(visits)s
+    elif [ "$#" -eq 0 ] || [ "$1" = "open" ]; then
+        local cd_file rc
+        cd_file="$(mktemp)"
+        BM_CD_FILE="$cd_file" command bm "$@"
+        rc=$?
+        [ -s "$cd_file" ] && cd "$(cat "$cd_file")"
+        rm -f "$cd_file"
+        return $rc
+    else
+        command bm "$@"
+    fi
+}
+"""
+
+BASH_COMPLETION = """\
+_bm_complete() {
+    local cur="${COMP_WORDS[COMP_CWORD]}"
+    if [ "$COMP_CWORD" -eq 1 ]; then
+        COMPREPLY=($(compgen -W "%(commands)s" -- "$cur"))
+    elif [ "$COMP_CWORD" -eq 2 ]; then
+        case "${COMP_WORDS[1]}" in
+            %(named)s)
+                local IFS=$'\\n'
+                COMPREPLY=($(compgen -W "$(cat %(names)s 2>/dev/null)" -- "$cur"))
+                ;;
+        esac
+    fi
+}
+complete -F _bm_complete bm
+"""
+
+ZSH_COMPLETION = """\
+_bm_complete() {
+    if (( CURRENT == 2 )); then
+        compadd -- %(commands)s
+    elif (( CURRENT == 3 )) && [[ ${words[2]} == (%(named)s) ]]; then
+        [ -r %(names)s ] && compadd -- ${(f)"$(<%(names)s)"}
+    fi
+}
+(( $+functions[compdef] )) && compdef _bm_complete bm
+"""
+
+FISH = """\
+function bm
+    if test "$argv[1]" = cd
+        set -l target (awk -F '\\t' -v name="$argv[2]" '$1 == name { print $2; exit }' \\
+            %(lookup)s 2>/dev/null)
+        if test -z "$target"
+            set target (command bm path $argv[2]); or return 1
+        end
+        test -d "$target"; or set target (dirname "$target")
+        cd "$target"; and printf '%%s\t%%s\n' $PWD (date +%%s) >> %(visits)s
+    else if test (count $argv) -eq 0; or test "$argv[1]" = open
+        set -l cd_file (mktemp)
+        env BM_CD_FILE=$cd_file bm $argv
+        set -l rc $status
+        test -s "$cd_file"; and cd (cat "$cd_file")
+        rm -f "$cd_file"
+        return $rc
+    else
+        command bm $argv
+    end
+end
+complete -c bm -f
+complete -c bm -n __fish_use_subcommand -a "%(commands)s"
+complete -c bm -n "__fish_seen_subcommand_from %(named)s" -a "(cat %(names)s 2>/dev/null)"
+"""
+
+# Subcommands offered by completion, and those taking a bookmark name.
+COMMANDS = ["open", "add", "rm", "list", "doctor", "import", "export", "path", "init", "cd"]
+NAMED = ["cd", "rm", "path"]
+
+
+def fish_quote(s):
+    return "'" + s.replace("\\", "\\\\").replace("'", "\\'") + "'"
+
+
+def init_script(shell, lookup, names, visits):
+    posix = {"lookup": shlex.quote(lookup), "visits": shlex.quote(visits)}
+    if shell == "bash":
+        return POSIX % posix + BASH_COMPLETION % {
+            "commands": " ".join(COMMANDS),
+            "named": "|".join(NAMED),
+            "names": shlex.quote(names),
+        }
+    elif shell == "zsh":
+        return POSIX % posix + ZSH_COMPLETION % {
+            "commands": " ".join(COMMANDS),
+            "named": "|".join(NAMED),
+            "names": shlex.quote(names),
+        }
+    elif shell == "fish":
+        return FISH % {
+            "lookup": fish_quote(lookup),
+            "visits": fish_quote(visits),
+            "commands": " ".join(COMMANDS),
+            "named": " ".join(NAMED),
+            "names": fish_quote(names),
+        }
+    raise ValueError(f"Unsupported shell {shell!r}")
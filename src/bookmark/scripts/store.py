@@ -0,0 +1,420 @@
+import fcntl
+import json
+import os
+import sqlite3
+import threading
+from contextlib import contextmanager
+
+
+BLANK = {"bookmarks": {}, "ignores": {"global": []}}
+
+
+def bookmark_path():
+    if os.getenv("BOOKMARK_PATH") is not None:
+        return os.getenv("BOOKMARK_PATH")
+    return os.getenv("HOME") + "/.bookmarks"
+
+
+def validate(json_dict):
+    try:
+        bookmarks = json_dict["bookmarks"]
+        ignores = json_dict["ignores"]
+    except (KeyError, TypeError):
+        raise ValueError("missing bookmarks or ignores")
+    if not (isinstance(bookmarks, dict) and isinstance(ignores, dict)):
+        raise ValueError("bookmarks and ignores must be objects")
+    for bookmark, path in bookmarks.items():
+        if not (isinstance(bookmark, str) and isinstance(path, str)):
+            raise ValueError(f"invalid bookmark {bookmark!r}")
+    for bookmark, ignore_list in ignores.items():
+        if not (isinstance(bookmark, str) and isinstance(ignore_list, list)):
+            raise ValueError(f"invalid ignore list for {bookmark!r}")
+        if not all(isinstance(x, str) for x in ignore_list):
+            raise ValueError(f"invalid ignore list for {bookmark!r}")
+    return bookmarks, ignores
+
+
+class BookmarkStore:
+    """Storage backend holding bookmarks and their ignore lists."""
+
+    def __init__(self, path):
+        self.path = path
+        self.listeners = []
+
+    def changed(self, added=None, removed=None):
+        """Tell the listeners what changed. ``added`` holds the new
+        ``(name, path)`` pairs and ``removed`` the removed names, and both
+        are None when any bookmark may have changed."""
+        for listener in self.listeners:
+            listener(self, added, removed)
+
+    def load(self):
+        raise NotImplementedError
+
+    def files(self):
+        return [self.path]
+
+    def get(self, name):
+        return self.load()[0].get(name)
+
+    def add(self, name, path):
+        raise NotImplementedError
+
+    def add_many(self, items):
+        for name, path in items:
+            self.add(name, path)
+
+    def remove(self, name):
+        raise NotImplementedError
+
+    def remove_many(self, names):
+        for name in names:
+            self.remove(name)
+
+    def ignore(self, bookmark, element):
+        raise NotImplementedError
+
+    def reset(self):
+        raise NotImplementedError
+
+    @property
+    def bookmarks(self):
+        return self.load()[0]
+
+    @property
+    def ignores(self):
+        return self.load()[1]
+
+
+class JsonStore(BookmarkStore):
+    """The original ~/.bookmarks format, rewritten in full on every change."""
+
+    def load(self):
+        with open(self.path, "r") as f:
+            try:
+                json_dict = json.load(f)
+            except json.JSONDecodeError as e:
+                raise ValueError(str(e))
+        return validate(json_dict)
+
+    def _dump(self, bookmarks, ignores):
+        json_dict = {"bookmarks": bookmarks, "ignores": ignores}
+        with open(self.path, "w") as f:
+            json.dump(json_dict, f, indent=4, separators=(",", ": "), sort_keys=True)
+
+    def add(self, name, path):
+        bookmarks, ignores = self.load()
+        bookmarks[name] = path
+        self._dump(bookmarks, ignores)
+        self.changed(added=[(name, path)])
+
+    def add_many(self, items):
+        items = list(items)
+        bookmarks, ignores = self.load()
+        bookmarks.update(items)
+        self._dump(bookmarks, ignores)
+        self.changed(added=items)
+
+    def remove(self, name):
+        bookmarks, ignores = self.load()
+        bookmarks.pop(name)
+        self._dump(bookmarks, ignores)
+        self.changed(removed=[name])
+
+    def remove_many(self, names):
+        names = list(names)
+        bookmarks, ignores = self.load()
+        for name in names:
+            bookmarks.pop(name)
+        self._dump(bookmarks, ignores)
+        self.changed(removed=names)
+
+    def ignore(self, bookmark, element):
+        bookmarks, ignores = self.load()
+        ignores.setdefault(bookmark, []).append(element)
+        self._dump(bookmarks, ignores)
+        self.changed(added=(), removed=())
+
+    def reset(self):
+        with open(self.path, "w") as f:
+            json.dump(BLANK, f)
+        self.changed()
+
+
+class SqliteStore(BookmarkStore):
+    """Indexed store, migrated once from the JSON file at ``json_path``."""
+
+    SCHEMA = """
+        CREATE TABLE IF NOT EXISTS bookmarks (
+            name TEXT PRIMARY KEY,
+            path TEXT NOT NULL
+        );
+        CREATE TABLE IF NOT EXISTS ignores (
+            bookmark TEXT NOT NULL,
+            element TEXT NOT NULL,
+            UNIQUE (bookmark, element)
+        );
+        CREATE TABLE IF NOT EXISTS meta (
+            key TEXT PRIMARY KEY,
+            value TEXT
+        );
+    """
+
+    def __init__(self, path, json_path=None):
+        super().__init__(path)
+        self.json_path = json_path
+        self._conn = None
+
+    def connect(self, migrate=True):
+        if self._conn is not None:
+            return self._conn
+        legacy = None
+        if migrate and not os.path.exists(self.path):
+            legacy = self._read_legacy()
+        conn = sqlite3.connect(self.path, timeout=10)
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.executescript(self.SCHEMA)
+        self._conn = conn
+        if legacy is not None:
+            self.migrate(*legacy)
+        return conn
+
+    def _read_legacy(self):
+        if self.json_path is None or not os.path.exists(self.json_path):
+            return None
+        # Raises ValueError before the database is created, so an invalid
+        # JSON file can still be fixed by hand or reset.
+        return JsonStore(self.json_path).load()
+
+    def migrate(self, bookmarks, ignores):
+        with self._conn as conn:
+            conn.executemany(
+                "INSERT OR REPLACE INTO bookmarks (name, path) VALUES (?, ?)",
+                bookmarks.items(),
+            )
+            conn.executemany(
+                "INSERT OR IGNORE INTO ignores (bookmark, element) VALUES (?, ?)",
+                [(b, el) for b, els in ignores.items() for el in els],
+            )
+            conn.execute(
+                "INSERT OR REPLACE INTO meta (key, value) VALUES ('migrated_from', ?)",
+                (self.json_path,),
+            )
+        self.changed()
+
+    def files(self):
+        return [self.path, self.path + "-wal"]
+
+    def load(self):
+        conn = self.connect()
+        bookmarks = dict(conn.execute("SELECT name, path FROM bookmarks"))
+        ignores = {"global": []}
+        for bookmark, element in conn.execute(
+            "SELECT bookmark, element FROM ignores ORDER BY rowid"
+        ):
+            ignores.setdefault(bookmark, []).append(element)
+        return bookmarks, ignores
+
+    def get(self, name):
+        row = (
+            self.connect()
+            .execute("SELECT path FROM bookmarks WHERE name = ?", (name,))
+            .fetchone()
+        )
+        return None if row is None else row[0]
+
+    def add(self, name, path):
+        with self.connect() as conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO bookmarks (name, path) VALUES (?, ?)",
+                (name, path),
+            )
+        self.changed(added=[(name, path)])
+
+    def add_many(self, items):
+        items = list(items)
+        with self.connect() as conn:
+            conn.executemany(
+                "INSERT OR REPLACE INTO bookmarks (name, path) VALUES (?, ?)", items
+            )
+        self.changed(added=items)
+
+    def remove(self, name):
+        with self.connect() as conn:
+            cursor = conn.execute("DELETE FROM bookmarks WHERE name = ?", (name,))
+            if cursor.rowcount == 0:
+                raise KeyError(name)
+        self.changed(removed=[name])
+
+    def remove_many(self, names):
+        names = list(names)
+        with self.connect() as conn:
+            for name in names:
+                cursor = conn.execute("DELETE FROM bookmarks WHERE name = ?", (name,))
+                if cursor.rowcount == 0:
+                    raise KeyError(name)
+        self.changed(removed=names)
+
+    def ignore(self, bookmark, element):
+        with self.connect() as conn:
+            conn.execute(
+                "INSERT OR IGNORE INTO ignores (bookmark, element) VALUES (?, ?)",
+                (bookmark, element),
+            )
+        self.changed(added=(), removed=())
+
+    def reset(self):
+        with self.connect(migrate=False) as conn:
+            conn.execute("DELETE FROM bookmarks")
+            conn.execute("DELETE FROM ignores")
+        self.changed()
+
+
+class JournalStore(BookmarkStore):
+    """JSON snapshot plus an append-only journal of changes.
+
+    Writers append one record per change under an advisory lock, so
+    concurrent ``bm`` processes never lose each other's updates. Readers
+    replay the journal on top of the snapshot, and once the journal grows
+    past ``limit`` bytes it is folded back into the snapshot on a
+    background thread.
+    """
+
+    def __init__(self, path, limit=64 * 1024):
+        super().__init__(path)
+        self.journal_path = path + ".journal"
+        self.lock_path = path + ".lock"
+        self.limit = limit
+
+    def files(self):
+        return [self.path, self.journal_path]
+
+    @contextmanager
+    def lock(self, exclusive=True):
+        with open(self.lock_path, "a") as f:
+            fcntl.flock(f, fcntl.LOCK_EX if exclusive else fcntl.LOCK_SH)
+            try:
+                yield
+            finally:
+                fcntl.flock(f, fcntl.LOCK_UN)
+
+    def _replay(self):
+        try:
+            bookmarks, ignores = JsonStore(self.path).load()
+        except FileNotFoundError:
+            bookmarks, ignores = {}, {"global": []}
+        try:
+            f = open(self.journal_path, "r")
+        except FileNotFoundError:
+            return bookmarks, ignores
+        with f:
+            for line in f:
+                try:
+                    record = json.loads(line)
+                except json.JSONDecodeError:
+                    # A writer died halfway through its record.
+                    continue
+                op = record.get("op")
+                if op == "add":
+                    bookmarks[record["name"]] = record["path"]
+                elif op == "rm":
+                    bookmarks.pop(record["name"], None)
+                elif op == "ignore":
+                    ignore_list = ignores.setdefault(record["bookmark"], [])
+                    if record["element"] not in ignore_list:
+                        ignore_list.append(record["element"])
+                elif op == "reset":
+                    bookmarks, ignores = {}, {"global": []}
+        return bookmarks, ignores
+
+    def _append(self, *records):
+        line = "".join(json.dumps(r, separators=(",", ":")) + "\n" for r in records)
+        fd = os.open(self.journal_path, os.O_WRONLY | os.O_APPEND | os.O_CREAT, 0o644)
+        try:
+            os.write(fd, line.encode("utf-8"))
+            size = os.fstat(fd).st_size
+        finally:
+            os.close(fd)
+        if size > self.limit:
+            threading.Thread(target=self.compact).start()
+
+    def load(self):
+        with self.lock(exclusive=False):
+            return self._replay()
+
+    def add(self, name, path):
+        with self.lock():
+            self._append({"op": "add", "name": name, "path": path})
+        self.changed(added=[(name, path)])
+
+    def add_many(self, items):
+        items = list(items)
+        with self.lock():
+            self._append(
+                *({"op": "add", "name": name, "path": path} for name, path in items)
+            )
+        self.changed(added=items)
+
+    def remove(self, name):
+        with self.lock():
+            if name not in self._replay()[0]:
+                raise KeyError(name)
+            self._append({"op": "rm", "name": name})
+        self.changed(removed=[name])
+
+    def remove_many(self, names):
+        names = list(names)
+        with self.lock():
+            bookmarks = self._replay()[0]
+            for name in names:
+                if name not in bookmarks:
+                    raise KeyError(name)
+            self._append(*({"op": "rm", "name": name} for name in names))
+        self.changed(removed=names)
+
+    def ignore(self, bookmark, element):
+        with self.lock():
+            self._append({"op": "ignore", "bookmark": bookmark, "element": element})
+        self.changed(added=(), removed=())
+
+    def compact(self):
+        with self.lock():
+            try:
+                if os.path.getsize(self.journal_path) <= self.limit:
+                    # Another writer compacted while we waited for the lock.
+                    return
+            except FileNotFoundError:
+                return
+            self._write_snapshot(*self._replay())
+
+    def _write_snapshot(self, bookmarks, ignores):
+        tmp_path = f"{self.path}.{os.getpid()}.tmp"
+        with open(tmp_path, "w") as f:
+            json.dump(
+                {"bookmarks": bookmarks, "ignores": ignores},
+                f,
+                indent=4,
+                separators=(",", ": "),
+                sort_keys=True,
+            )
+        os.replace(tmp_path, self.path)
+        open(self.journal_path, "w").close()
+
+    def reset(self):
+        with self.lock():
+            self._write_snapshot({}, {"global": []})
+        self.changed()
+
+
+BACKENDS = {"json": JsonStore, "sqlite": SqliteStore, "journal": JournalStore}
+
+
+def get_store():
+    backend = os.getenv("BOOKMARK_BACKEND", "sqlite")
+    path = bookmark_path()
+    if backend == "sqlite":
+        return SqliteStore(os.getenv("BOOKMARK_DB", path + ".db"), json_path=path)
+    try:
+        return BACKENDS[backend](path)
+    except KeyError:
+        raise ValueError(f"Unknown bookmark backend {backend!r}")
@@ -0,0 +1,86 @@
+import threading
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from bookmark.scripts import scanner
+
+
+class Walker:
+    """Breadth-first walk that lists directories on a thread pool.
+
+    ``roots`` are ``(key, path, depth)`` triples for the directories to
+    start from. Each directory is scanned by the workers, and the listing
+    is handed to ``attach(key, path, listing)`` on the walker's own thread
+    while holding ``lock``. ``listing`` is None if the directory could not
+    be scanned. ``attach`` returns the ``(key, path)`` pairs of the
+    subdirectories to walk next. Listings come from ``scan(path)``, which
+    must be safe to call from several threads. ``on_done`` is called, also
+    under ``lock``, when the walk completes. After ``cancel`` returns,
+    neither is called again.
+    """
+
+    def __init__(
+        self,
+        roots,
+        attach,
+        max_depth=-1,
+        lock=None,
+        workers=8,
+        on_done=None,
+        scan=scanner.scan,
+    ):
+        self.roots = list(roots)
+        self.scan = scan
+        self.attach = attach
+        self.on_done = on_done
+        self.max_depth = max_depth
+        self.lock = threading.RLock() if lock is None else lock
+        self.workers = workers
+        self.cancelled = threading.Event()
+        self.scanned = 0
+        self.done = False
+        self.thread = None
+
+    def start(self):
+        self.thread = threading.Thread(target=self.run, daemon=True)
+        self.thread.start()
+
+    def cancel(self):
+        with self.lock:
+            self.cancelled.set()
+
+    def run(self):
+        frontier = deque(self.roots)
+        pending = {}
+        pool = ThreadPoolExecutor(max_workers=self.workers)
+        try:
+            while (frontier or pending) and not self.cancelled.is_set():
+                while frontier:
+                    key, path, depth = frontier.popleft()
+                    if self.max_depth >= 0 and depth > self.max_depth:
+                        continue
+                    future = pool.submit(self.scan, path)
+                    pending[future] = (key, path, depth)
+                if not pending:
+                    break
+                done, _ = wait(pending, timeout=0.1, return_when=FIRST_COMPLETED)
+                for future in done:
+                    key, path, depth = pending.pop(future)
+                    try:
+                        listing = future.result()
+                    except OSError:
+                        listing = None
+                    with self.lock:
+                        if self.cancelled.is_set():
+                            return
+                        self.scanned += 1
+                        children = self.attach(key, path, listing)
+                    frontier.extend(
+                        (child, child_path, depth + 1)
+                        for child, child_path in children
+                    )
+            with self.lock:
+                if self.on_done is not None and not self.cancelled.is_set():
+                    self.on_done()
+        finally:
+            self.done = True
+            pool.shutdown(wait=False, cancel_futures=True)
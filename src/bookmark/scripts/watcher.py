@@ -0,0 +1,218 @@
+import ctypes
+import errno
+import os
+import select
+import struct
+
+
+IN_MOVED_FROM = 0x00000040
+IN_MOVED_TO = 0x00000080
+IN_CREATE = 0x00000100
+IN_DELETE = 0x00000200
+IN_DELETE_SELF = 0x00000400
+IN_MOVE_SELF = 0x00000800
+IN_Q_OVERFLOW = 0x00004000
+IN_IGNORED = 0x00008000
+IN_ONLYDIR = 0x01000000
+
+# Only changes to the set of names in a directory matter to the tree.
+MASK = (
+    IN_MOVED_FROM
+    | IN_MOVED_TO
+    | IN_CREATE
+    | IN_DELETE
+    | IN_DELETE_SELF
+    | IN_MOVE_SELF
+    | IN_ONLYDIR
+)
+
+EVENT = struct.Struct("iIII")
+
+
+class PollingWatcher:
+    """Notices changed directories by comparing their mtimes on each poll."""
+
+    def __init__(self):
+        self.mtimes = {}
+
+    def watch(self, path):
+        if path not in self.mtimes:
+            self.mtimes[path] = self._mtime(path)
+        return self.mtimes[path] is not None
+
+    def unwatch(self, path):
+        self.mtimes.pop(path, None)
+
+    @staticmethod
+    def _mtime(path):
+        try:
+            return os.stat(path).st_mtime_ns
+        except OSError:
+            return None
+
+    def poll(self):
+        changed = set()
+        for path, mtime in self.mtimes.items():
+            current = self._mtime(path)
+            if current != mtime:
+                self.mtimes[path] = current
+                changed.add(path)
+        return changed
+
+    def close(self):
+        self.mtimes.clear()
+
+
+class InotifyWatcher:
+    """Collects inotify events for the watched directories.
+
+    ``poll`` never blocks and returns each changed directory once, however
+    many events it received. Directories that cannot get a watch, for
+    instance once ``max_user_watches`` is reached, are polled instead.
+    """
+
+    def __init__(self):
+        self.libc = ctypes.CDLL(None, use_errno=True)
+        fd = self.libc.inotify_init1(os.O_NONBLOCK | os.O_CLOEXEC)
+        if fd < 0:
+            error = ctypes.get_errno()
+            raise OSError(error, os.strerror(error))
+        self.fd = fd
+        self.paths = {}
+        self.wds = {}
+        self.fallback = PollingWatcher()
+
+    def watch(self, path):
+        if path in self.wds:
+            return True
+        wd = self.libc.inotify_add_watch(self.fd, os.fsencode(path), MASK)
+        if wd < 0:
+            if ctypes.get_errno() in (errno.ENOSPC, errno.ENOMEM):
+                return self.fallback.watch(path)
+            return False
+        self.paths[wd] = path
+        self.wds[path] = wd
+        return True
+
+    def unwatch(self, path):
+        self.fallback.unwatch(path)
+        wd = self.wds.pop(path, None)
+        if wd is not None:
+            self.paths.pop(wd, None)
+            self.libc.inotify_rm_watch(self.fd, wd)
+
+    def _read(self):
+        chunks = []
+        while True:
+            try:
+                chunk = os.read(self.fd, 64 * 1024)
+            except BlockingIOError:
+                break
+            if not chunk:
+                break
+            chunks.append(chunk)
+        return b"".join(chunks)
+
+    def poll(self):
+        changed = self.fallback.poll()
+        if not select.select([self.fd], [], [], 0)[0]:
+            return changed
+        data = self._read()
+        offset = 0
+        while offset + EVENT.size <= len(data):
+            wd, mask, cookie, length = EVENT.unpack_from(data, offset)
+            offset += EVENT.size + length
+            if mask & IN_Q_OVERFLOW:
+                # Events were dropped, so any directory may have changed.
+                changed.update(self.wds)
+                continue
+            path = self.paths.get(wd)
+            if path is None:
+                continue
+            changed.add(path)
+            if mask & IN_IGNORED:
+                self.paths.pop(wd, None)
+                self.wds.pop(path, None)
+        return changed
+
+    def close(self):
+        if self.fd is not None:
+            os.close(self.fd)
+            self.fd = None
+        self.paths.clear()
+        self.wds.clear()
+        self.fallback.close()
+
+
+class WatchHub:
+    """One watcher shared by the trees of several bookmarks.
+
+    A directory is watched while any tree asks for it. Each tree subscribes
+    a set, and ``poll`` adds the changed directories to every subscribed set,
+    so a change is seen by each tree whichever of them polls first. The
+    shared ``index`` stops trusting the listings of changed directories.
+    """
+
+    def __init__(self, watcher, index=None):
+        self.watcher = watcher
+        self.index = index
+        self.counts = {}
+        self.subscribers = []
+
+    def subscribe(self):
+        pending = set()
+        self.subscribers.append(pending)
+        return pending
+
+    def unsubscribe(self, pending):
+        self.subscribers = [other for other in self.subscribers if other is not pending]
+
+    def add(self, path):
+        self.counts[path] = self.counts.get(path, 0) + 1
+        self.rearm(path)
+
+    def rearm(self, path):
+        # Also restores the watch of a directory that was replaced.
+        if self.watcher.watch(path) and self.index is not None:
+            self.index.trust(path)
+
+    def remove(self, path):
+        count = self.counts.get(path, 0) - 1
+        if count > 0:
+            self.counts[path] = count
+            return
+        self.counts.pop(path, None)
+        self.watcher.unwatch(path)
+        if self.index is not None:
+            self.index.distrust((path,))
+
+    def poll(self):
+        changed = self.watcher.poll()
+        if changed:
+            if self.index is not None:
+                self.index.distrust(changed)
+            for pending in self.subscribers:
+                pending.update(changed)
+        return changed
+
+    def close(self):
+        self.watcher.close()
+        self.counts.clear()
+        self.subscribers = []
+
+
+def create_watcher():
+    """Return a watcher as chosen by ``BOOKMARK_WATCH``, or None.
+
+    ``inotify`` (the default where available) falls back to ``poll`` on
+    other systems, and ``off`` disables watching.
+    """
+    mode = os.getenv("BOOKMARK_WATCH", "inotify")
+    if mode == "off":
+        return None
+    if mode == "inotify":
+        try:
+            return InotifyWatcher()
+        except (OSError, AttributeError):
+            pass
+    return PollingWatcher()
@@ -0,0 +1,31 @@
+import os
+import sys
+
+import pytest
+
+SRC = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "src")
+sys.path.insert(0, SRC)
+
+# getkey needs a stdin with a file descriptor when the dashboard is
+# imported, and pytest replaces stdin.
+stdin, sys.stdin = sys.stdin, open(os.devnull)
+try:
+    import bookmark.components.app  # noqa: F401
+finally:
+    sys.stdin = stdin
+
+
+@pytest.fixture
+def home(tmp_path, monkeypatch):
+    """An empty HOME, with the module state that caches the store reset."""
+    from bookmark.scripts import frecency, loader
+
+    home = tmp_path / "home"
+    home.mkdir()
+    monkeypatch.setenv("HOME", str(home))
+    for name in list(os.environ):
+        if name.startswith(("BOOKMARK_", "BM_")) or name == "XDG_CACHE_HOME":
+            monkeypatch.delenv(name)
+    monkeypatch.setattr(loader, "_state", {"store": None, "stamp": None, "data": None})
+    monkeypatch.setattr(frecency, "_frecency", None)
+    return home
@@ -0,0 +1,92 @@
+import os
+import random
+import shutil
+
+from bookmark.components.widgets.bookmark_dir_tree import DirTree, reload_children
+from bookmark.scripts import scanner
+from bookmark.scripts.dir_index import DirIndex, index_path
+from bookmark.scripts.watcher import PollingWatcher, WatchHub
+
+ENTRIES = 60
+
+
+def name(node):
+    return node.label[node.label.rfind("]") + 1 :]
+
+
+def make_entries(root, prefix, count):
+    for i in range(count):
+        if i % 3:
+            (root / f"{prefix}file_{i}").write_text("")
+        else:
+            (root / f"{prefix}dir_{i}").mkdir()
+            (root / f"{prefix}dir_{i}" / "inner").write_text("")
+
+
+def check_tree(tree):
+    reachable = {}
+    stack = [tree]
+    while stack:
+        node = stack.pop()
+        reachable[node.id] = node
+        stack.extend(node.children)
+        if node.type != "dir" or not node.processed:
+            continue
+        dirs, files = scanner.scan(node.path)
+        labels = [name(c) for c in node.children if c.type != "more"]
+        assert labels == dirs + files, node.path
+    assert tree.nodes == reachable
+
+
+def test_reload_children_follows_the_disk(home):
+    root = home / "root"
+    root.mkdir()
+    make_entries(root, "", ENTRIES)
+    tree = DirTree(str(root))
+    tree.initialize(str(root))
+    check_tree(tree)
+
+    rng = random.Random(0)
+    entries = sorted(os.listdir(root))
+    rng.shuffle(entries)
+    deleted, renamed = entries[:15], entries[15:30]
+    for entry in deleted:
+        path = root / entry
+        if path.is_dir():
+            shutil.rmtree(path)
+        else:
+            path.unlink()
+    for entry in renamed:
+        (root / entry).rename(root / f"renamed_{entry}")
+    make_entries(root, "new_", ENTRIES // 2)
+
+    reload_children(tree)
+    check_tree(tree)
+    # Directories that were listed before keep their listing.
+    kept = [c for c in tree.children if c.type == "dir" and name(c) in entries]
+    assert kept and all(c.processed for c in kept)
+
+
+def test_refresh_leaves_saving_the_index_to_close(home):
+    root = home / "root"
+    root.mkdir()
+    make_entries(root, "", 6)
+    index = DirIndex()
+    tree = DirTree(str(root), index=index, hub=WatchHub(PollingWatcher(), index))
+    tree.add_recursive(str(root))
+    tree.save_index()
+    path = index_path(str(root))
+    saved = os.stat(path).st_mtime_ns
+    # Backdated, so any save after this one shows.
+    os.utime(path, ns=(0, 0))
+
+    (root / "added").write_text("")
+    # The polling watcher compares mtimes, which may not have ticked yet.
+    os.utime(root, ns=(saved + 10**9, saved + 10**9))
+    assert tree.refresh()
+    assert "added" in [name(c) for c in tree.children]
+    assert os.stat(path).st_mtime_ns == 0
+
+    tree.close()
+    with open(path) as f:
+        assert "added" in f.read()
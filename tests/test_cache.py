@@ -0,0 +1,32 @@
+import multiprocessing
+
+from bookmark.scripts import cache, loader
+from bookmark.scripts.manage_bookmarks import add_bookmark
+
+WRITERS = 4
+ADDS = 100
+
+
+def add_many(writer):
+    for i in range(ADDS):
+        add_bookmark(f"w{writer}-{i}", f"/tmp/{writer}/{i}")
+
+
+def test_parallel_writers_keep_the_lookup_in_sync(home, monkeypatch):
+    monkeypatch.setenv("BOOKMARK_BACKEND", "journal")
+    loader.get_store().reset()
+    context = multiprocessing.get_context("fork")
+    writers = [
+        context.Process(target=add_many, args=(writer,)) for writer in range(WRITERS)
+    ]
+    for writer in writers:
+        writer.start()
+    for writer in writers:
+        writer.join()
+        assert writer.exitcode == 0
+    bookmarks = sorted(loader.load()[0].items())
+    assert len(bookmarks) == WRITERS * ADDS
+    with open(cache.lookup_path()) as f:
+        assert f.read() == "".join(f"{name}\t{path}\n" for name, path in bookmarks)
+    with open(cache.names_path()) as f:
+        assert f.read() == "".join(f"{name}\n" for name, path in bookmarks)
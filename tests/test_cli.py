@@ -0,0 +1,61 @@
+import json
+import os
+import subprocess
+import sys
+
+import pytest
+
+from conftest import SRC
+
+# Seconds to import the CLI and print a command's help. Importing rich, the
+# dashboard or the search stack on the way costs more than this alone.
+BUDGET = 0.3
+HEAVY = ["rich", "rich_click", "bookmark.components", "regex", "thefuzz"]
+COMMANDS = ["", "open", "add", "rm", "list", "import", "export", "doctor", "path", "init"]
+
+SCRIPT = """
+import json, sys, time
+start = time.perf_counter()
+from bookmark.scripts.cli import cli
+try:
+    cli(sys.argv[1:], prog_name="bm")
+except SystemExit:
+    pass
+elapsed = time.perf_counter() - start
+sys.stderr.write(json.dumps({"elapsed": elapsed, "modules": sorted(sys.modules)}))
+"""
+
+
+@pytest.mark.parametrize("command", COMMANDS)
+def test_help_starts_within_budget(command, home):
+    env = dict(os.environ, PYTHONPATH=SRC, BM_PLAIN="1")
+    args = [command, "--help"] if command else ["--help"]
+    result = subprocess.run(
+        [sys.executable, "-c", SCRIPT, *args],
+        env=env,
+        stdout=subprocess.PIPE,
+        stderr=subprocess.PIPE,
+        text=True,
+        check=True,
+    )
+    assert "Usage" in result.stdout
+    report = json.loads(result.stderr)
+    assert [module for module in HEAVY if module in report["modules"]] == []
+    assert report["elapsed"] < BUDGET
+
+
+def test_add_and_rm_do_not_load_the_store(home, monkeypatch):
+    from bookmark.scripts import cache, store
+    from bookmark.scripts.cli import cli
+
+    def load(self):
+        raise AssertionError("the whole store was loaded")
+
+    project = home / "project"
+    project.mkdir()
+    cli(["add", "project", str(project)], prog_name="bm", standalone_mode=False)
+    monkeypatch.setattr(store.SqliteStore, "load", load)
+    cli(["add", "other", str(project)], prog_name="bm", standalone_mode=False)
+    cli(["rm", "project"], prog_name="bm", standalone_mode=False)
+    with open(cache.names_path()) as f:
+        assert f.read() == "other\n"
@@ -0,0 +1,168 @@
+import io
+import re
+import time
+
+import pytest
+from rich.cells import get_character_cell_size
+from rich.console import Console
+
+from bookmark.components import app as app_module
+from bookmark.components.screen import Screen
+from bookmark.scripts import loader
+
+WIDTH = 100
+HEIGHT = 30
+# A full frame at this size is about 6 KB.
+CURSOR_BUDGET = 1024
+
+TOKEN = re.compile(r"\x1b\[([0-9;?]*)([A-Za-z])|([^\x1b])", re.S)
+
+
+class Terminal:
+    """Just enough of a terminal to replay what Screen writes: cursor moves,
+    clearing, SGR styles and text."""
+
+    def __init__(self, width, height):
+        self.width = width
+        self.height = height
+        self.clear()
+        self.x = self.y = 0
+        self.sgr = ""
+
+    def clear(self):
+        self.cells = [[(" ", "")] * self.width for _ in range(self.height)]
+
+    def feed(self, data):
+        for match in TOKEN.finditer(data):
+            params, command, char = match.groups()
+            if char is not None:
+                if char == "\n":
+                    self.x, self.y = 0, self.y + 1
+                    continue
+                size = get_character_cell_size(char)
+                if size == 0:
+                    text, sgr = self.cells[self.y][self.x - 1]
+                    self.cells[self.y][self.x - 1] = (text + char, sgr)
+                    continue
+                self.cells[self.y][self.x] = (char, self.sgr)
+                if size == 2:
+                    self.cells[self.y][self.x + 1] = ("", self.sgr)
+                self.x += size
+            elif command == "m":
+                self.sgr = "" if params in ("", "0") else f"{self.sgr};{params}"
+            elif command == "H":
+                row, _, column = params.partition(";")
+                self.y, self.x = int(row or 1) - 1, int(column or 1) - 1
+            elif command == "J" and params == "2":
+                self.clear()
+
+
+class CountingFile(io.StringIO):
+    def __init__(self):
+        super().__init__()
+        self.bytes = 0
+
+    def write(self, data):
+        self.bytes += len(data.encode("utf-8"))
+        return super().write(data)
+
+
+@pytest.fixture
+def project(home):
+    root = home / "project"
+    for directory in ("src", "docs", "tests"):
+        (root / directory).mkdir(parents=True)
+        for i in range(12):
+            (root / directory / f"file_{i}.py").write_text(f"value = {i}\n" * 40)
+    loader.get_store().add_many([("project", str(root)), ("docs", str(root / "docs"))])
+    return root
+
+
+def full_render(app, width, height):
+    file = io.StringIO()
+    console = Console(
+        file=file,
+        force_terminal=True,
+        width=width,
+        height=height,
+        color_system="truecolor",
+    )
+    with app.lock:
+        Screen(app.layout, console).refresh()
+    terminal = Terminal(width, height)
+    terminal.feed(file.getvalue())
+    return terminal.cells
+
+
+def test_frames_write_only_changes(project, monkeypatch):
+    file = CountingFile()
+    console = Console(
+        file=file,
+        force_terminal=True,
+        width=WIDTH,
+        height=HEIGHT,
+        color_system="truecolor",
+    )
+    monkeypatch.setattr(app_module, "get_console", lambda: console)
+    app = app_module.App()
+    terminal = Terminal(WIDTH, HEIGHT)
+    frames = []
+
+    def settle():
+        # Waits for the frame of the last key, then checks what the
+        # terminal shows against a full render.
+        while app.renderer.dirty or app.renderer.wake.is_set():
+            time.sleep(0.005)
+        with app.lock:
+            pass
+        data = file.getvalue()
+        terminal.feed(data[settle.fed :])
+        settle.fed = len(data)
+        assert terminal.cells == full_render(app, WIDTH, HEIGHT)
+
+    settle.fed = 0
+
+    def keys():
+        time.sleep(0.1)
+        settle()
+        for key in ["2"] + ["j"] * 8 + ["k"] * 5 + ["x", None, "s", "f", "\x1b", "j"]:
+            before = file.bytes
+            if key is None:
+                time.sleep(0.2)
+            else:
+                yield key
+            time.sleep(0.05)
+            settle()
+            frames.append((key, file.bytes - before))
+        yield "q"
+
+    script = keys()
+    monkeypatch.setattr(app_module, "getkey", lambda: next(script))
+    app.run()
+
+    moves = [written for key, written in frames if key in ("j", "k")]
+    assert moves and max(moves) < CURSOR_BUDGET
+    # An unbound key and an idle wait draw nothing.
+    assert [written for key, written in frames if key in ("x", None)] == [0, 0]
+
+
+def test_resize_redraws_everything(project):
+    app = app_module.App()
+    app.setup()
+    app.mode = None
+    file = io.StringIO()
+    console = Console(
+        file=file,
+        force_terminal=True,
+        width=WIDTH,
+        height=HEIGHT,
+        color_system="truecolor",
+    )
+    screen = Screen(app.layout, console)
+    screen.refresh()
+    console.size = (80, 24)
+    start = len(file.getvalue())
+    screen.refresh()
+    terminal = Terminal(80, 24)
+    terminal.feed(file.getvalue()[start:])
+    assert terminal.cells == full_render(app, 80, 24)
@@ -0,0 +1,59 @@
+import json
+import multiprocessing
+
+from bookmark.scripts.store import JournalStore
+
+WRITERS = 4
+ADDS = 150
+# Small enough that the journal is compacted many times during the writes.
+LIMIT = 2048
+
+
+def add_many(path, writer):
+    store = JournalStore(path, limit=LIMIT)
+    for i in range(ADDS):
+        store.add(f"w{writer}-{i}", f"/tmp/{writer}/{i}")
+
+
+def journal_records(store):
+    with open(store.journal_path, "r") as f:
+        data = f.read()
+    assert data == "" or data.endswith("\n")
+    return [json.loads(line) for line in data.splitlines()]
+
+
+def test_parallel_writers_keep_every_add(tmp_path):
+    path = str(tmp_path / "bookmarks")
+    context = multiprocessing.get_context("fork")
+    writers = [
+        context.Process(target=add_many, args=(path, writer)) for writer in range(WRITERS)
+    ]
+    for writer in writers:
+        writer.start()
+    for writer in writers:
+        writer.join()
+        assert writer.exitcode == 0
+    store = JournalStore(path, limit=LIMIT)
+    bookmarks, ignores = store.load()
+    assert bookmarks == {
+        f"w{writer}-{i}": f"/tmp/{writer}/{i}"
+        for writer in range(WRITERS)
+        for i in range(ADDS)
+    }
+    # Each record parses, so no writer or compaction left half a line.
+    journal_records(store)
+    with open(path, "r") as f:
+        json.load(f)
+
+
+def test_reset_then_replay(tmp_path):
+    store = JournalStore(str(tmp_path / "bookmarks"), limit=LIMIT)
+    store.add_many([(f"old{i}", f"/old/{i}") for i in range(50)])
+    store.ignore("old1", "node_modules")
+    store.reset()
+    assert store._replay() == ({}, {"global": []})
+    assert journal_records(store) == []
+    store.add("new", "/new")
+    store.remove("new")
+    store.add("kept", "/kept")
+    assert store._replay() == ({"kept": "/kept"}, {"global": []})